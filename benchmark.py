@@ -0,0 +1,557 @@
+"""
+Benchmarks do qatool.
+
+    python benchmark.py extrator --profundidade 40 --largura 3 --repeticoes 3
+    python benchmark.py pipeline --tamanhos 50 200 800 --salvar base.json
+    python benchmark.py pipeline --comparar base.json --tolerancia 0.25
+    python benchmark.py matching --blocos 1000 4000 16000 --paragrafos 400
+    python benchmark.py importacao --limite 0.5
+    python benchmark.py lote --paginas 50 200 800 --paragrafos 400
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from bs4 import BeautifulSoup
+
+import qatool
+
+PALAVRAS = (
+    "dog puppy breed coat health training energy friendly family size large small "
+    "veterinary exercise grooming temperament nutrition playful loyal active calm"
+).split()
+
+
+def frase(rng, minimo=6, maximo=18):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(minimo, maximo))).capitalize() + "."
+
+
+# ---------------------- EXTRATOR HTML ----------------------
+
+def gerar_html_aninhado(profundidade, largura, paragrafos=3, semente=0):
+    """Página de page builder: divs aninhadas, cada nível com parágrafos, spans e links."""
+    rng = random.Random(semente)
+
+    def nivel(d):
+        if d == 0:
+            return "".join(f"<p>{frase(rng)} <strong>{frase(rng, 2, 4)}</strong></p>" for _ in range(paragrafos))
+        filhos = "".join(
+            f'<div class="wrapper-{d}-{i}"><span>{frase(rng)}</span>{nivel(d - 1)}</div>'
+            for i in range(largura if d <= 2 else 1)
+        )
+        return f'<div class="row"><h3>{frase(rng, 2, 5)}</h3><a href="/x/{d}">{frase(rng, 2, 3)}</a>{filhos}</div>'
+
+    return (
+        "<html><head><title>Benchmark</title></head><body><nav>menu</nav>"
+        f"<main>{nivel(profundidade)}<div>Previous Next</div></main><footer>rodapé</footer></body></html>"
+    )
+
+
+def extrator_legado(html):
+    """Extração anterior à passada única (decompose + find_all aninhado), para referência."""
+    soup = BeautifulSoup(html, "html.parser")
+    main = soup.find("main")
+    if not main or len(main.get_text(strip=True)) < 50:
+        main = soup.body
+    for tag in main.find_all(['footer', 'nav', 'script', 'style', 'noscript', 'menu', 'dialog']):
+        tag.decompose()
+    textos = []
+    for tag in main.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'span', 'div']):
+        raw_text = tag.get_text(" ", strip=True)
+        if "Previous Next" in raw_text or "Anterior Siguiente" in raw_text:
+            continue
+        txt = qatool.clean_text(raw_text)
+        if txt:
+            textos.append(txt)
+    qatool.coletar_elementos_html(main)
+    return textos
+
+
+def extrator_passada_unica(parser):
+    def extrair(html):
+        main = BeautifulSoup(html, parser).find("main")
+        return qatool.extrair_conteudo(main).blocos
+    return extrair
+
+
+def cronometrar(funcao, html, repeticoes):
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        qatool._clean_text.cache_clear()
+        inicio = time.perf_counter()
+        resultado = funcao(html)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def bench_extrator(args):
+    extratores = {"legado (html.parser)": extrator_legado,
+                  "passada única (html.parser)": extrator_passada_unica("html.parser")}
+    if qatool.PARSER_HTML == "lxml":
+        extratores["passada única (lxml)"] = extrator_passada_unica("lxml")
+
+    print(f"{'profundidade':>12} {'extrator':<28} {'tempo (s)':>10} {'blocos':>8} {'caracteres':>12}")
+    for profundidade in args.profundidade:
+        html = gerar_html_aninhado(profundidade, args.largura)
+        for nome, funcao in extratores.items():
+            tempo, blocos = cronometrar(funcao, html, args.repeticoes)
+            print(f"{profundidade:>12} {nome:<28} {tempo:>10.4f} {len(blocos):>8} {sum(map(len, blocos)):>12}")
+
+
+# ---------------------- FIXTURES SINTÉTICAS ----------------------
+
+_NS_DOCX = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:v="urn:schemas-microsoft-com:vml" mc:Ignorable="wps"'
+)
+_TIPOS_DOCX = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS_DOCX = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+
+
+def _run(texto, negrito=False, italico=False):
+    props = ("<w:b/>" if negrito else "") + ("<w:i/>" if italico else "")
+    rpr = f"<w:rPr>{props}</w:rPr>" if props else ""
+    return f'<w:r>{rpr}<w:t xml:space="preserve">{escape(texto)}</w:t></w:r>'
+
+
+def _caixa_texto(texto):
+    # Como o Word grava: a mesma caixa em mc:Choice (wps) e em mc:Fallback (VML)
+    conteudo = f"<w:txbxContent><w:p>{_run(texto, negrito=True)}</w:p></w:txbxContent>"
+    return (
+        "<w:r><mc:AlternateContent><mc:Choice Requires=\"wps\"><w:drawing><wp:anchor><a:graphic>"
+        f"<a:graphicData><wps:wsp><wps:txbx>{conteudo}</wps:txbx></wps:wsp></a:graphicData>"
+        "</a:graphic></wp:anchor></w:drawing></mc:Choice><mc:Fallback><w:pict><v:shape><v:textbox>"
+        f"{conteudo}</v:textbox></v:shape></w:pict></mc:Fallback></mc:AlternateContent></w:r>"
+    )
+
+
+def gerar_docx(caminho, paragrafos, tabela=(), caixas=()):
+    """
+    Escreve um .docx mínimo direto em OOXML. paragrafos é uma lista de listas
+    de (texto, negrito, italico); tabela, uma lista de linhas (listas de células).
+    """
+    passo = max(1, len(paragrafos) // len(caixas)) if caixas else 0
+    corpo = []
+    for i, runs in enumerate(paragrafos):
+        xml = "".join(_run(*r) for r in runs)
+        if passo and i % passo == 0 and i // passo < len(caixas):
+            xml += _caixa_texto(caixas[i // passo])
+        corpo.append(f"<w:p>{xml}</w:p>")
+    if tabela:
+        linhas = "".join(
+            "<w:tr>" + "".join(f"<w:tc><w:p>{_run(c)}</w:p></w:tc>" for c in linha) + "</w:tr>"
+            for linha in tabela
+        )
+        corpo.append(f"<w:tbl>{linhas}</w:tbl>")
+    documento = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document {_NS_DOCX}><w:body>{"".join(corpo)}<w:sectPr/></w:body></w:document>'
+    )
+    with zipfile.ZipFile(caminho, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", _TIPOS_DOCX)
+        z.writestr("_rels/.rels", _RELS_DOCX)
+        z.writestr("word/document.xml", documento)
+
+
+def _alterar(rng, texto):
+    palavras = texto.split()
+    palavras[rng.randrange(len(palavras))] = rng.choice(PALAVRAS)
+    return " ".join(palavras)
+
+
+def gerar_par(pasta, nome, n_paragrafos, profundidade, semente=0):
+    """
+    Gera nome.docx e nome.html coerentes entre si: ~70% dos parágrafos vão
+    iguais para a página, ~15% alterados e ~15% ficam faltando; a página tem
+    divs aninhadas, accordion, breed-table, imagens, links e carrossel.
+    """
+    rng = random.Random(semente)
+    titulo = f"Guia de raças {nome}"
+    descricao = frase(rng, 10, 16)
+    paragrafos = [[(f"Title tag: {titulo}", False, False)], [(f"Meta description: {descricao}", False, False)]]
+    blocos_html = []
+    for _ in range(n_paragrafos):
+        texto, destaque = frase(rng), frase(rng, 2, 4)
+        paragrafos.append([(texto + " ", False, False), (destaque, rng.random() < 0.6, rng.random() < 0.3)])
+        sorteio = rng.random()
+        if sorteio < 0.70:
+            blocos_html.append(f"<p>{escape(texto)} <strong>{escape(destaque)}</strong></p>")
+        elif sorteio < 0.85:
+            blocos_html.append(f"<p>{escape(_alterar(rng, texto))} <em>{escape(destaque)}</em></p>")
+    tabela = [["Tamanho", "Grande"], ["Energia", "Alta"], ["Pelagem", "Curta"], ["Saúde", "Boa"]]
+    caixas = [frase(rng, 3, 6) for _ in range(max(1, n_paragrafos // 50))]
+    gerar_docx(os.path.join(pasta, f"{nome}.docx"), paragrafos, tabela, caixas)
+
+    # Distribui os blocos em seções aninhadas até a profundidade pedida
+    por_secao = max(1, len(blocos_html) // max(1, profundidade))
+    miolo = ""
+    for d in range(profundidade, 0, -1):
+        trecho = "".join(blocos_html[(d - 1) * por_secao:d * por_secao] if d > 1 else blocos_html[:por_secao])
+        imagem = (f'<img src="/sites/default/files/styles/ttt_image_510/public/{nome}-{d}.jpg" '
+                  f'alt="{escape(frase(rng, 3, 5))}">')
+        miolo = (f'<div class="section-{d}"><div class="row"><h2>{escape(frase(rng, 2, 5))}</h2>'
+                 f'<span>{trecho}</span>{imagem}<a href="/guia/{d}">{escape(frase(rng, 2, 3))}</a>{miolo}</div></div>')
+    restantes = "".join(blocos_html[profundidade * por_secao:])
+    linhas = "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in tabela)
+    html = f"""<html><head><title>{escape(titulo)}</title>
+<meta name="description" content="{escape(descricao)}"><meta property="og:title" content="{escape(titulo)}">
+</head><body><header><nav><a href="/">Início</a><a href="/racas">Raças</a></nav></header>
+<div id="onetrust-banner-sdk"><p>Usamos cookies para melhorar sua experiência.</p></div>
+<main><h1>{escape(titulo)}</h1>{miolo}{restantes}
+<a class="accordion--text-v2">Puntuación Veterinaria</a>
+<div class="text-image--text-wrapper col-12 col-xl-5 order-3 order-xl-2">
+<table class="breed-table breed-table-col-2">{linhas}</table></div>
+<div class="carousel"><div>Relacionados</div><button>Previous</button> <button>Next</button></div>
+</main><footer><p>Rodapé</p></footer></body></html>"""
+    with open(os.path.join(pasta, f"{nome}.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+    return os.path.join(pasta, f"{nome}.docx"), f"{nome}.html", n_paragrafos + len(tabela)
+
+
+class ServidorLocal:
+    """Servidor HTTP em thread servindo uma pasta (as páginas sintéticas)."""
+
+    def __init__(self, pasta):
+        manipulador = partial(_ManipuladorSilencioso, directory=pasta)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _ManipuladorSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+# ---------------------- PIPELINE ----------------------
+
+def _versao():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def bench_pipeline(args):
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        pares = []
+        for n in args.tamanhos:
+            profundidade = max(2, int(n ** 0.5) // 2) if args.profundidade is None else args.profundidade
+            docx, pagina, linhas = gerar_par(pasta, f"p{n}", n, profundidade, semente=n)
+            pares.append((n, profundidade, docx, pagina, linhas))
+
+        saida = os.path.join(pasta, "saida")
+        os.makedirs(saida)
+        with ServidorLocal(pasta) as servidor:
+            # Aquecimento descartado: importações sob demanda e caches de
+            # primeira chamada não entram na medição do primeiro tamanho
+            _, _, docx, pagina, _ = min(pares)
+            qatool.processar_par(docx, servidor.url + pagina, saida, "aquecimento", perfil=args.perfil)
+            for n, profundidade, docx, pagina, linhas in pares:
+                rastros = []
+                for rep in range(args.repeticoes):
+                    qatool._clean_text.cache_clear()
+                    qatool.normalizar.cache_clear()
+                    with qatool.Rastreador(f"p{n}", memoria=args.memoria) as r:
+                        qatool.processar_par(docx, servidor.url + pagina, saida, f"p{n}", perfil=args.perfil)
+                    rastros.append(r.como_dict())
+                total = statistics.median(t["total_s"] for t in rastros)
+                etapas = {}
+                for t in rastros:
+                    for e in t["etapas"]:
+                        etapas.setdefault(e["etapa"], []).append(e)
+                resultados.append({
+                    "tamanho": n,
+                    "profundidade": profundidade,
+                    "linhas_docx": linhas,
+                    "total_s": round(total, 4),
+                    "paginas_por_min": round(60 / total, 1) if total else None,
+                    "paragrafos_por_s": round(linhas / total, 1) if total else None,
+                    "pico_rss_mb": max(t["pico_rss_mb"] or 0 for t in rastros),
+                    "etapas": {
+                        nome: {
+                            "segundos": round(statistics.median(e["segundos"] for e in lista), 4),
+                            **({"pico_python_mb": max(e.get("pico_python_mb", 0) for e in lista)}
+                               if args.memoria else {}),
+                        }
+                        for nome, lista in etapas.items()
+                    },
+                })
+
+    relatorio = {"versao": _versao(), "perfil": args.perfil, "repeticoes": args.repeticoes,
+                 "python": sys.version.split()[0], "resultados": resultados}
+    _imprimir_pipeline(relatorio)
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        return 1 if regressoes(base, relatorio, args.tolerancia, args.minimo) else 0
+    return 0
+
+
+def _imprimir_pipeline(relatorio):
+    print(f"versão {relatorio['versao'] or '?'} | perfil {relatorio['perfil']} | "
+          f"mediana de {relatorio['repeticoes']} execuções")
+    print(f"{'tamanho':>8} {'prof.':>5} {'total (s)':>10} {'páginas/min':>12} {'parágrafos/s':>13} {'pico RSS (MB)':>14}")
+    for r in relatorio["resultados"]:
+        print(f"{r['tamanho']:>8} {r['profundidade']:>5} {r['total_s']:>10.3f} {r['paginas_por_min']:>12} "
+              f"{r['paragrafos_por_s']:>13} {r['pico_rss_mb']:>14}")
+    print()
+    print(f"{'tamanho':>8} {'etapa':<28} {'segundos':>10} {'pico Python (MB)':>17}")
+    for r in relatorio["resultados"]:
+        for nome, e in r["etapas"].items():
+            print(f"{r['tamanho']:>8} {nome:<28} {e['segundos']:>10.4f} {e.get('pico_python_mb', ''):>17}")
+
+
+def regressoes(base, atual, tolerancia, minimo):
+    """
+    Compara o relatório atual com um salvo: acusa etapas (e totais) mais de
+    tolerancia (fração) mais lentas. Diferenças abaixo de minimo segundos são ruído.
+    """
+    anteriores = {r["tamanho"]: r for r in base["resultados"]}
+    achados = []
+    for r in atual["resultados"]:
+        antes = anteriores.get(r["tamanho"])
+        if not antes:
+            continue
+        pares = [("total", antes["total_s"], r["total_s"])]
+        pares += [(nome, antes["etapas"][nome]["segundos"], e["segundos"])
+                  for nome, e in r["etapas"].items() if nome in antes["etapas"]]
+        for nome, t_antes, t_agora in pares:
+            if t_agora - t_antes > minimo and t_agora > t_antes * (1 + tolerancia):
+                achados.append((r["tamanho"], nome, t_antes, t_agora))
+    print()
+    if not achados:
+        print(f"Sem regressões em relação a {base.get('versao') or 'base'} (tolerância {tolerancia:.0%}).")
+    for tamanho, nome, t_antes, t_agora in achados:
+        print(f"REGRESSÃO  tamanho {tamanho:<6} {nome:<28} {t_antes:.4f}s -> {t_agora:.4f}s "
+              f"(+{(t_agora / t_antes - 1) if t_antes else float('inf'):.0%})")
+    return achados
+
+
+# ---------------------- MATCHING APROXIMADO ----------------------
+
+SILABAS = "ba be bi bo bu ca ce ci co da de di do fa fe fi go ka la le li lo ma me mi mo na ne ni no pa pe " \
+          "pi po ra re ri ro sa se si so ta te ti to va ve vi za".split()
+
+
+def vocabulario_listagem(tamanho, semente=0):
+    """Pseudopalavras para simular o vocabulário variado de páginas de listagem."""
+    rng = random.Random(semente)
+    return sorted({"".join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4))) for _ in range(tamanho)})
+
+
+def gerar_listagem(n_blocos, n_paragrafos, semente=0):
+    """
+    Blocos de uma página de categoria (nomes e descrições curtas) e parágrafos
+    do DOCX: metade copiada de algum bloco com uma palavra trocada, metade nova.
+    """
+    rng = random.Random(semente)
+    vocabulario = vocabulario_listagem(max(2000, n_blocos * 2), semente)
+
+    def texto(minimo, maximo):
+        return " ".join(rng.choice(vocabulario) if rng.random() < 0.75 else rng.choice(PALAVRAS)
+                        for _ in range(rng.randint(minimo, maximo)))
+
+    blocos = [texto(3, 25) for _ in range(n_blocos)]
+    paragrafos = [_alterar(rng, rng.choice(blocos)) if rng.random() < 0.5 else texto(8, 20)
+                  for _ in range(n_paragrafos)]
+    return paragrafos, blocos
+
+
+def bench_matching(args):
+    # vetorização entra nos dois tempos; fica à parte para mostrar o que sobra para o matching
+    print(f"{'blocos':>8} {'parágrafos':>10} {'vetorização (s)':>16} {'exaustivo (s)':>14} {'aproximado (s)':>15} "
+          f"{'speedup':>8} {'recall':>8} {'recall ≥ Partial':>17} {'perda máx.':>11}")
+    for n_blocos in args.blocos:
+        paragrafos, blocos = gerar_listagem(n_blocos, args.paragrafos, semente=n_blocos)
+        consultas, candidatos = qatool.normalizar_lote(paragrafos), qatool.normalizar_lote(blocos)
+        contador = qatool.ajustar_vocabulario(consultas, candidatos)
+        vetorizacao = float("inf")
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            qatool._vetorizar(consultas, contador)
+            qatool._vetorizar(candidatos, contador)
+            vetorizacao = min(vetorizacao, time.perf_counter() - inicio)
+        tempos = {}
+        for aproximado in (False, True):
+            melhor = float("inf")
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                qatool.melhores_matches(consultas, candidatos, contador, aproximado=aproximado)
+                melhor = min(melhor, time.perf_counter() - inicio)
+            tempos[aproximado] = melhor
+        recall = qatool.recall_aproximado(consultas, candidatos, contador)
+        print(f"{n_blocos:>8} {args.paragrafos:>10} {vetorizacao:>16.3f} {tempos[False]:>14.3f} {tempos[True]:>15.3f} "
+              f"{tempos[False] / tempos[True]:>7.1f}x {recall['recall']:>8.3f} {recall['recall_relevante']:>17.3f} "
+              f"{recall['perda_max']:>11.3f}")
+
+
+# ---------------------- LOTE ----------------------
+
+# Roda num processo novo: o pico de RSS (ru_maxrss) só cresce dentro de um processo
+_SONDA_LOTE = """
+import json, resource, sys, time
+import qatool
+manifesto, pasta, workers, concorrencia = sys.argv[1:]
+inicio = time.perf_counter()
+falhas = sum(r["status"] != "ok" for r in qatool.executar_lote(
+    qatool.ler_manifesto(manifesto), pasta, int(workers), int(concorrencia), "estatico"))
+divisor = 2**20 if sys.platform == "darwin" else 2**10
+print(json.dumps({"segundos": time.perf_counter() - inicio, "falhas": falhas, "pai_mb": qatool._pico_rss_mb(),
+                  "filhos_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor, 1)}))
+"""
+
+
+def bench_lote(args):
+    print(f"{'páginas':>8} {'total (s)':>10} {'páginas/s':>10} {'pico pai (MB)':>14} {'pico worker (MB)':>17} "
+          f"{'falhas':>7}")
+    with tempfile.TemporaryDirectory() as pasta:
+        # Poucas páginas distintas; a query string torna cada URL do lote única
+        pares = [gerar_par(pasta, f"m{k}", args.paragrafos, 6, semente=k) for k in range(args.distintas)]
+        with ServidorLocal(pasta) as servidor:
+            for n in args.paginas:
+                manifesto = os.path.join(pasta, f"lote{n}.csv")
+                with open(manifesto, "w", newline="", encoding="utf-8") as f:
+                    escritor = csv.writer(f)
+                    escritor.writerow(["docx", "url", "output"])
+                    for i in range(n):
+                        docx, pagina, _ = pares[i % len(pares)]
+                        escritor.writerow([docx, f"{servidor.url}{pagina}?i={i}", f"p{i}"])
+                saida = os.path.join(pasta, f"saida{n}")
+                medida = json.loads(subprocess.run(
+                    [sys.executable, "-c", _SONDA_LOTE, manifesto, saida, str(args.workers), str(args.concorrencia)],
+                    capture_output=True, text=True, check=True,
+                    cwd=os.path.dirname(os.path.abspath(qatool.__file__))).stdout)
+                shutil.rmtree(saida, ignore_errors=True)
+                print(f"{n:>8} {medida['segundos']:>10.2f} {n / medida['segundos']:>10.1f} "
+                      f"{medida['pai_mb']:>14} {medida['filhos_mb']:>17} {medida['falhas']:>7}")
+
+
+# ---------------------- IMPORTAÇÃO ----------------------
+
+# Nenhum destes pode ser carregado por `import qatool` (só quando a etapa roda)
+MODULOS_PESADOS = ("numpy", "pandas", "scipy", "sklearn", "bs4", "openpyxl", "playwright", "tkinter", "pyarrow")
+
+_SONDA_IMPORTACAO = """
+import json, sys, time
+inicio = time.perf_counter()
+import qatool
+segundos = time.perf_counter() - inicio
+print(json.dumps({"segundos": segundos, "pesados": sorted(m for m in %r if m in sys.modules)}))
+"""
+
+
+def medir_importacao():
+    """Tempo de `import qatool` num interpretador novo e os módulos pesados que vieram junto."""
+    saida = subprocess.run([sys.executable, "-c", _SONDA_IMPORTACAO % (MODULOS_PESADOS,)],
+                           capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.abspath(qatool.__file__)))
+    return json.loads(saida.stdout)
+
+
+def bench_importacao(args):
+    medidas = [medir_importacao() for _ in range(args.repeticoes)]
+    melhor = min(m["segundos"] for m in medidas)
+    pesados = sorted({p for m in medidas for p in m["pesados"]})
+    print(f"import qatool: {melhor:.3f}s (melhor de {args.repeticoes}; limite {args.limite:.3f}s)")
+    if pesados:
+        print("carregados na importação: " + ", ".join(pesados))
+    if melhor > args.limite or pesados:
+        print("FORA DO ORÇAMENTO")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_ext = sub.add_parser("extrator", help="extrator legado x passada única em páginas aninhadas")
+    p_ext.add_argument("--profundidade", type=int, nargs="+", default=[10, 20, 40, 80])
+    p_ext.add_argument("--largura", type=int, default=3)
+    p_ext.add_argument("--repeticoes", type=int, default=3)
+    p_ext.set_defaults(func=bench_extrator)
+
+    p_pipe = sub.add_parser("pipeline", help="pipeline completo em DOCX/HTML sintéticos servidos localmente")
+    p_pipe.add_argument("--tamanhos", type=int, nargs="+", default=[50, 200, 800],
+                        help="parágrafos do DOCX em cada par gerado")
+    p_pipe.add_argument("--profundidade", type=int, default=None,
+                        help="aninhamento das seções da página (padrão: cresce com o tamanho)")
+    p_pipe.add_argument("--repeticoes", type=int, default=3)
+    p_pipe.add_argument("--perfil", choices=sorted(qatool.PERFIS_RENDER), default="estatico",
+                        help="perfil de renderização (completo/rapido precisam do Chromium)")
+    p_pipe.add_argument("--memoria", action="store_true", help="pico de memória Python por etapa")
+    p_pipe.add_argument("--salvar", help="grava o relatório em JSON (base para comparações)")
+    p_pipe.add_argument("--comparar", help="relatório JSON anterior para acusar regressões")
+    p_pipe.add_argument("--tolerancia", type=float, default=0.2, help="fração de piora aceita")
+    p_pipe.add_argument("--minimo", type=float, default=0.01, help="diferença mínima em segundos")
+    p_pipe.set_defaults(func=bench_pipeline)
+
+    p_match = sub.add_parser("matching", help="matching exaustivo x aproximado em páginas de listagem")
+    p_match.add_argument("--blocos", type=int, nargs="+", default=[1000, 4000, 16000])
+    p_match.add_argument("--paragrafos", type=int, default=400)
+    p_match.add_argument("--repeticoes", type=int, default=3)
+    p_match.set_defaults(func=bench_matching)
+
+    p_lote = sub.add_parser("lote", help="pico de memória e vazão de executar_lote conforme o lote cresce")
+    p_lote.add_argument("--paginas", type=int, nargs="+", default=[50, 200, 800])
+    p_lote.add_argument("--paragrafos", type=int, default=400, help="parágrafos de cada página gerada")
+    p_lote.add_argument("--distintas", type=int, default=8, help="páginas diferentes servidas (repetidas no lote)")
+    p_lote.add_argument("-w", "--workers", type=int, default=2)
+    p_lote.add_argument("-c", "--concorrencia", type=int, default=8)
+    p_lote.set_defaults(func=bench_lote)
+
+    p_imp = sub.add_parser("importacao", help="orçamento de tempo do `import qatool` (sai com 1 se estourar)")
+    p_imp.add_argument("--limite", type=float, default=0.5, help="segundos aceitos para importar")
+    p_imp.add_argument("--repeticoes", type=int, default=5)
+    p_imp.set_defaults(func=bench_importacao)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,564 +1,3533 @@
-import os
-import re
-import pandas as pd
-from docx import Document
-from docx.oxml.ns import qn
-from bs4 import BeautifulSoup
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
-from tkinter import Tk, filedialog, simpledialog, messagebox, Button, Label
-from tkinter import ttk
-from pathlib import Path
-from playwright.sync_api import sync_playwright
-
-# ---------------------- AUXILIARES ----------------------
-
-def clean_text(text):
-    if not isinstance(text, str):
-        return ""
-    # Remove links (http, www, etc.) e parênteses vazios
-    text = re.sub(
-        r'\s*(?:\([^()]*?(?:https?://|www\.|/)[^()]*?\)|(?:https?://|www\.|/)[^\s()]+)\s*',
-        ' ',
-        text
-    )
-    text = re.sub(r'\(\s*\)', '', text)
-    # Colapsa espaços extras, mas preserva espaço antes de pontuação
-    text = re.sub(r'\s+|(\s+)(?=[.,!?:;])', lambda m: '' if m.group(1) else ' ', text)
-    return text.strip()
-
-
-def extrair_metadados(soup):
-    return {
-        "Title Tag": soup.title.string.strip() if soup.title else "",
-        "Meta Description": soup.find("meta", {"name": "description"})['content'].strip()
-                             if soup.find("meta", {"name": "description"}) else "",
-        "Open Graph Title": soup.find("meta", {"property": "og:title"})['content'].strip()
-                             if soup.find("meta", {"property": "og:title"}) else "",
-        "Open Graph Description": soup.find("meta", {"property": "og:description"})['content'].strip()
-                                  if soup.find("meta", {"property": "og:description"}) else ""
-    }
-
-
-def extrair_alt_tags(soup):
-    return [img.get("alt", "").strip() for img in soup.find_all("img") if img.get("alt")]
-
-
-def coletar_elementos_html(main):
-    # Remove footer
-    footer = main.find('footer')
-    if footer:
-        footer.decompose()
-
-    elementos = []
-    # Headings, bold e italic (mantém seu filtro original)
-    for i in range(1, 7):
-        for tag in main.find_all(f'h{i}'):
-            texto = clean_text(tag.get_text(" ", strip=True))
-            if texto:
-                elementos.append(['Heading', f'h{i}', texto, ''])
-    for tag in main.find_all(['strong', 'b']):
-        texto = clean_text(tag.get_text(" ", strip=True))
-        if texto:
-            elementos.append(['Bold', '', texto, ''])
-    for tag in main.find_all(['em', 'i']):
-        texto = clean_text(tag.get_text(" ", strip=True))
-        if texto:
-            elementos.append(['Italic', '', texto, ''])
-
-    # Hyperlinks
-    ignorar = {
-        '/#copy_link', '/#x', '/#facebook', '/#whatsapp',
-        'https://www.addtoany.com',
-        'https://www.nestle.be/fr/info/yourdata',
-        'https://www.onetrust.com/products/cookie-consent/'
-    }
-    for tag in main.find_all('a', href=True):
-        href = tag['href'].strip()
-        texto = clean_text(tag.get_text(" ", strip=True))
-        # filtra anchors vazios ou indesejados
-        if (not href
-            or href.startswith('#')
-            or href in ignorar
-            or texto.lower() in ('previous next', 'anterior siguiente')):
-            continue
-        elementos.append([
-            'Hyperlink',  # Coluna A
-            '',           # Coluna B em branco
-            texto,        # Coluna C
-            href          # Coluna D
-        ])
-
-    return pd.DataFrame(
-        elementos,
-        columns=['Definição', 'Heading', 'Texto', 'Link']
-    )
-
-
-def carregar_texto_docx(path):
-    doc = Document(path)
-    return [clean_text(p.text) for p in doc.paragraphs if p.text.strip()]
-
-
-def carregar_texto_url(url):
-    """
-    Carrega a página via Playwright, aguarda networkidle, faz scroll,
-    extrai o título do accordion “Puntuación Veterinaria” pela <a class="accordion--text-v2">,
-    depois extrai a tabela dentro da div específica e todos os blocos de texto úteis,
-    ignorando apenas o header “Previous Next” que aparece junto ao título.
-    """
-    # 1) Render JS e aguardar carregamento
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(url, timeout=60000)
-        page.wait_for_load_state("networkidle")
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        page.wait_for_timeout(1000)
-        html = page.content()
-        browser.close()
-
-    soup = BeautifulSoup(html, 'html.parser')
-    textos = []
-
-    # 2) Captura título do accordion via <a class="accordion--text-v2">
-    for a_tag in soup.find_all("a", class_="accordion--text-v2"):
-        raw = clean_text(a_tag.get_text(" ", strip=True))
-        if raw:
-            textos.append(raw)
-
-    # 3) Localiza a div do accordion “Puntuación Veterinaria” e extrai a tabela, se existir
-    accordion_div = soup.find(
-        "div",
-        {
-            "class": "text-image--text-wrapper col-12 col-xl-5 order-3 order-xl-2"
-        }
-    )
-    if accordion_div:
-        tabela = accordion_div.find("table", {"class": "breed-table breed-table-col-2"})
-        if tabela:
-            for linha in tabela.find_all("tr"):
-                células = linha.find_all("td")
-                if len(células) >= 2:
-                    chave = clean_text(células[0].get_text(" ", strip=True))
-                    valor = clean_text(células[1].get_text(" ", strip=True))
-                    if chave and valor:
-                        textos.append(f"{chave}: {valor}")
-
-    # 4) Extrai metadados e define main
-    metadados = extrair_metadados(soup)
-    main = soup.find("main")
-    if not main or len(main.get_text(strip=True)) < 50:
-        main = soup.body
-
-    # Remove footer, nav, scripts, estilos e noscript do main
-    for tag in main.find_all(['footer', 'nav', 'script', 'style', 'noscript', 'menu', 'dialog']):
-        tag.decompose()
-
-    # Extrai lista de alt tags para comparação
-    alt_tags = extrair_alt_tags(main)
-
-    # Extrai imagens para nova aba: URL e Texto Alt
-    imagens = []
-    for img in main.find_all("img"):
-        alt = img.get("alt", "").strip()
-        src = img.get("src", "").strip()
-        # incluir só se vier do style que você quer
-        if alt and src and "/styles/ttt_image_510/" in src:
-            imagens.append((src, clean_text(alt)))
-
-
-    # 5) Extrai h1–h6, p, li, span e div do main, mas ignora blocos que contenham "Previous Next"
-    blocos = main.find_all(['h1','h2','h3','h4','h5','h6','p','li','span','div'])
-    for tag in blocos:
-        raw_text = tag.get_text(" ", strip=True)
-        if "Previous Next" in raw_text or "Anterior Siguiente" in raw_text:
-            continue
-        txt = clean_text(raw_text)
-        if txt:
-            textos.append(txt)
-
-    titulo = soup.title.string.strip() if soup.title else "pagina"
-    return textos, main, metadados, alt_tags, titulo, imagens
-
-
-def safe_best_match(query, candidates):
-    """
-    Retorna (melhor_texto, similaridade) ou ("", 0.0).
-    Evita erro de "empty vocabulary" quando não há texto útil.
-    """
-    query = clean_text(query.lower())
-    candidatos_limpos = [clean_text(c.lower()) for c in candidates if clean_text(c)]
-    if not query or not candidatos_limpos:
-        return "", 0.0
-
-    try:
-        vectorizer = TfidfVectorizer(stop_words='english')
-        corpus = [query] + candidatos_limpos
-        tfidf = vectorizer.fit_transform(corpus)
-        sims = cosine_similarity(tfidf[0:1], tfidf[1:]).flatten()
-        idx_max = sims.argmax()
-        return candidates[idx_max], float(sims[idx_max])
-    except ValueError:
-        return "", 0.0
-
-
-def comparar_textos(lista_docx, lista_html, metadados, alt_tags):
-    resultados = []
-
-    for texto_doc in lista_docx:
-        if not texto_doc.strip():
-            continue
-        texto_limpo = clean_text(texto_doc.strip().lower())
-        prefixos_ignorados = [
-            "in dit artikel", "title tag:", "meta description:", "og title:", "og description:",
-            "[alt text da imagem]", "alt tag :", "title tag", "meta description",
-            "open graph title", "open graph description", "-- meta --", "en:", "be-fr:",
-            "guide des races de chiens", "alt-tag:", "-- meta –", "title tag", "Etiqueta alt: ", "Etiqueta alt:"
-        ]
-        if any(texto_limpo.startswith(p) for p in prefixos_ignorados):
-            continue
-
-        # Bloco "alt-tag"
-        if texto_limpo.startswith("alt-tag"):
-            original_alt = texto_doc.split(":", 1)[1].strip()
-            match_text, score = safe_best_match(original_alt, alt_tags)
-            if score >= 0.85:
-                status = "Exact"
-            elif score >= 0.75:
-                status = "Similar"
-            elif score >= 0.4:
-                status = "Partial"
-            else:
-                status = "Missing"
-            resultados.append({
-                "Document Text": original_alt,
-                "Webpage Match": match_text,
-                "Status": status,
-                "Similarity": round(score * 100, 1)
-            })
-            continue
-
-        # Checa match exato em metadados
-        tipo_meta = next((k for k, v in metadados.items() if v and texto_doc.strip() == v.strip()), None)
-        if not tipo_meta:
-            melhor_meta = ""
-            melhor_score_mt = 0.0
-            for k, v in metadados.items():
-                if not v.strip():
-                    continue
-                _, sim = safe_best_match(texto_doc, [v])
-                if sim > melhor_score_mt:
-                    melhor_score_mt = sim
-                    melhor_meta = k
-            if melhor_score_mt > 0.85:
-                tipo_meta = melhor_meta
-
-        if tipo_meta:
-            sim_meta = safe_best_match(texto_doc, [metadados[tipo_meta]])[1]
-            if sim_meta >= 0.85:
-                status = "Exact"
-            elif sim_meta >= 0.75:
-                status = "Similar"
-            elif sim_meta >= 0.4:
-                status = "Partial"
-            else:
-                status = "Missing"
-            resultados.append({
-                "Document Text": texto_doc,
-                "Webpage Match": metadados[tipo_meta],
-                "Status": status,
-                "Similarity": round(sim_meta * 100, 1)
-            })
-            continue
-
-        # Senão, compara contra blocos HTML
-        match_html, score_html = "", 0.0
-        if lista_html:
-            match_html, score_html = safe_best_match(texto_doc, lista_html)
-        if score_html >= 0.85:
-            status = "Exact"
-        elif score_html >= 0.75:
-            status = "Similar"
-        elif score_html >= 0.4:
-            status = "Partial"
-        else:
-            status = "Missing"
-        resultados.append({
-            "Document Text": texto_doc,
-            "Webpage Match": match_html,
-            "Status": status,
-            "Similarity": round(score_html * 100, 1)
-        })
-
-    return pd.DataFrame(resultados)
-
-
+import os
+import re
+import importlib
+import sys
+import csv
+import json
+import time
+import gzip
+import hashlib
+import sqlite3
+import argparse
+import zipfile
+import xml.etree.ElementTree as ET
+import asyncio
+import queue
+import threading
+import cProfile
+import tracemalloc
+import contextvars
+import inspect
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import Counter, namedtuple
+from functools import lru_cache, partial, wraps
+from pathlib import Path
+from urllib.parse import quote, urldefrag, urljoin, urlparse, urlsplit
+import http.client
+import urllib.request
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ---------------------- IMPORTAÇÕES SOB DEMANDA ----------------------
+# pandas, scipy, sklearn, bs4, openpyxl, Playwright e tkinter só carregam
+# quando a etapa que os usa roda: `import qatool` fica leve e a interface
+# não é exigida em máquinas sem display. Os módulos usados em todo lugar
+# (np, pd, sparse, tk) são proxies; o resto é importado dentro da função.
+# Orçamento de importação: python benchmark.py importacao
+
+
+class _ModuloPreguicoso:
+    """Importa o módulo no primeiro acesso a um atributo e guarda o atributo."""
+
+    def __init__(self, nome):
+        self._nome = nome
+
+    def __getattr__(self, atributo):
+        valor = getattr(importlib.import_module(self._nome), atributo)
+        setattr(self, atributo, valor)
+        return valor
+
+    def __repr__(self):
+        return f"<módulo sob demanda {self._nome!r}>"
+
+
+np = _ModuloPreguicoso("numpy")
+pd = _ModuloPreguicoso("pandas")
+sparse = _ModuloPreguicoso("scipy.sparse")
+tk = _ModuloPreguicoso("tkinter")
+ttk = _ModuloPreguicoso("tkinter.ttk")
+filedialog = _ModuloPreguicoso("tkinter.filedialog")
+simpledialog = _ModuloPreguicoso("tkinter.simpledialog")
+messagebox = _ModuloPreguicoso("tkinter.messagebox")
+
+# ---------------------- INSTRUMENTAÇÃO ----------------------
+# Cada etapa do pipeline registra tempo de parede, contagens e memória no
+# Rastreador ativo (se houver). Sem Rastreador, etapa() não faz nada.
+
+_RASTREADOR = contextvars.ContextVar("rastreador", default=None)
+
+
+def _pico_rss_mb():
+    """Pico de memória residente do processo (inclui o que não é Python)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+class Rastreador:
+    """
+    Coleta as etapas de uma execução:
+
+        with Rastreador("minha-pagina", memoria=True) as r:
+            processar_par(...)
+        r.salvar_json("trace.json")
+
+    memoria=True liga o tracemalloc (pico de memória Python por etapa, mais
+    lento); perfilar="comparar_textos" roda essa etapa sob cProfile e grava
+    o .prof em pasta_perfil.
+    """
+
+    def __init__(self, rotulo="", memoria=False, perfilar=None, pasta_perfil="."):
+        self.rotulo = rotulo
+        self.memoria = memoria
+        self.perfilar = perfilar
+        self.pasta_perfil = pasta_perfil
+        self.etapas = []
+        self.inicio = None
+        self.total = None
+        self._picos = []
+        self._ligou_tracemalloc = False
+
+    def __enter__(self):
+        self._token = _RASTREADOR.set(self)
+        self.inicio = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._ligou_tracemalloc = True
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total = time.perf_counter() - self._t0
+        if self._ligou_tracemalloc:
+            tracemalloc.stop()
+        _RASTREADOR.reset(self._token)
+
+    def iniciou(self, nome):
+        """Chamado quando uma etapa começa (a interface mostra o progresso por aqui)."""
+
+    def registrar(self, nome, segundos, **info):
+        self.etapas.append({"etapa": nome, "segundos": round(segundos, 4), **info})
+
+    def como_dict(self):
+        return {
+            "rotulo": self.rotulo,
+            "inicio": self.inicio,
+            "total_s": round(self.total, 4) if self.total is not None else None,
+            "pico_rss_mb": _pico_rss_mb(),
+            "etapas": self.etapas,
+        }
+
+    def salvar_json(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.como_dict(), f, ensure_ascii=False, indent=2)
+
+
+@contextmanager
+def etapa(nome, **contagens):
+    """Mede o bloco como uma etapa; o dict devolvido recebe contagens extras."""
+    r = _RASTREADOR.get()
+    info = dict(contagens)
+    if r is None:
+        yield info
+        return
+    r.iniciou(nome)
+
+    medir_memoria = r.memoria and tracemalloc.is_tracing()
+    if medir_memoria:
+        # O pico é zerado por etapa; o da etapa externa é guardado na pilha
+        if r._picos:
+            r._picos[-1] = max(r._picos[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    r._picos.append(0)
+    perfil = cProfile.Profile() if r.perfilar == nome else None
+    inicio = time.perf_counter()
+    if perfil:
+        perfil.enable()
+    try:
+        yield info
+    finally:
+        if perfil:
+            perfil.disable()
+        segundos = time.perf_counter() - inicio
+        pico = r._picos.pop()
+        if medir_memoria:
+            pico = max(pico, tracemalloc.get_traced_memory()[1])
+            if r._picos:
+                r._picos[-1] = max(r._picos[-1], pico)
+            info["pico_python_mb"] = round(pico / 2**20, 1)
+        if perfil:
+            os.makedirs(r.pasta_perfil, exist_ok=True)
+            rotulo = re.sub(r"[^\w.-]+", "_", r.rotulo or "execucao")[:60]
+            destino = os.path.join(r.pasta_perfil, f"{rotulo}_{nome}_{len(r.etapas)}.prof")
+            perfil.dump_stats(destino)
+            info["cprofile"] = destino
+        r.registrar(nome, segundos, **info)
+
+
+def anunciar_etapa(nome):
+    """Avisa o Rastreador ativo que uma etapa medida por fora começou."""
+    r = _RASTREADOR.get()
+    if r is not None:
+        r.iniciou(nome)
+
+
+def registrar_etapa(nome, segundos, **info):
+    """Registra uma etapa medida por fora (ex.: tempos do navegador)."""
+    r = _RASTREADOR.get()
+    if r is not None:
+        r.registrar(nome, segundos, **info)
+
+
+def instrumentado(nome, contar=None):
+    """
+    Decorador: a função vira uma etapa. contar(resultado, *args) retorna as
+    contagens a registrar (parágrafos, blocos...); args são todos os
+    parâmetros da função em ordem, com os padrões, mesmo se a chamada usou
+    nomes.
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with etapa(nome) as info:
+                resultado = funcao(*args, **kwargs)
+                if contar and _RASTREADOR.get() is not None:
+                    chamada = assinatura.bind(*args, **kwargs)
+                    chamada.apply_defaults()
+                    info.update(contar(resultado, *chamada.args, **chamada.kwargs))
+            return resultado
+        return envolvida
+    return decorador
+
+
+def _etapas_render(marcas):
+    if marcas.get("cache"):
+        return [("renderizar.cache", 0.0)]
+    return [(f"renderizar.{k}", marcas[k]) for k in ("inicializacao", "navegacao", "espera") if k in marcas]
+
+
+def agregar_rastros(rastros):
+    """Tabela por etapa somando os rastros de um lote (um por página)."""
+    linhas = [dict(e, rotulo=r.get("rotulo", "")) for r in rastros for e in r.get("etapas", [])]
+    if not linhas:
+        return pd.DataFrame()
+    df = pd.DataFrame(linhas)
+    grupos = df.groupby("etapa", sort=False)
+    tabela = grupos["segundos"].agg(execucoes="size", total_s="sum", media_s="mean", max_s="max")
+    if "pico_python_mb" in df:
+        tabela["pico_python_mb"] = grupos["pico_python_mb"].max()
+    contagens = [c for c in df.select_dtypes("number").columns if c not in ("segundos", "pico_python_mb")]
+    for coluna in contagens:
+        tabela[coluna] = grupos[coluna].sum(min_count=1)
+    return tabela.sort_values("total_s", ascending=False).round(4)
+
+
+# ---------------------- AUXILIARES ----------------------
+
+_RE_LINKS = re.compile(
+    r'\s*(?:\([^()]*?(?:https?://|www\.|/)[^()]*?\)|(?:https?://|www\.|/)[^\s()]+)\s*'
+)
+_RE_PARENTESES_VAZIOS = re.compile(r'\(\s*\)')
+_RE_ESPACOS = re.compile(r'\s+|(\s+)(?=[.,!?:;])')
+
+TAMANHO_CACHE_TEXTO = 65536
+
+# Texto já limpo e em minúsculas, guardado junto do original
+Bloco = namedtuple("Bloco", ["texto", "normalizado"])
+
+
+def clean_text(text):
+    if not isinstance(text, str):
+        return ""
+    return _clean_text(text)
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_TEXTO)
+def _clean_text(text):
+    # Remove links (http, www, etc.) e parênteses vazios
+    text = _RE_LINKS.sub(' ', text)
+    text = _RE_PARENTESES_VAZIOS.sub('', text)
+    # Colapsa espaços extras, mas preserva espaço antes de pontuação
+    text = _RE_ESPACOS.sub(lambda m: '' if m.group(1) else ' ', text)
+    return text.strip()
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_TEXTO)
+def normalizar(text):
+    """Forma usada no matching: clean_text sobre o texto em minúsculas."""
+    return clean_text(text.lower())
+
+
+def _e_series(obj):
+    """isinstance(obj, pd.Series) sem importar o pandas: se ele não foi carregado, não há Series."""
+    return "pandas" in sys.modules and isinstance(obj, pd.Series)
+
+
+def limpar_lote(textos):
+    """clean_text sobre uma lista ou pandas Series (retorna o mesmo tipo)."""
+    if _e_series(textos):
+        return textos.map(clean_text)
+    return [clean_text(t) for t in textos]
+
+
+def normalizar_lote(textos):
+    """
+    Converte textos em Blocos (original + normalizado), uma vez por string.
+    Blocos já normalizados passam direto.
+    """
+    if _e_series(textos):
+        textos = textos.tolist()
+    return [
+        t if isinstance(t, Bloco) else Bloco(t, normalizar(t) if isinstance(t, str) else "")
+        for t in textos
+    ]
+
+
+def extrair_metadados(soup):
+    return {
+        "Title Tag": soup.title.string.strip() if soup.title else "",
+        "Meta Description": soup.find("meta", {"name": "description"})['content'].strip()
+                             if soup.find("meta", {"name": "description"}) else "",
+        "Open Graph Title": soup.find("meta", {"property": "og:title"})['content'].strip()
+                             if soup.find("meta", {"property": "og:title"}) else "",
+        "Open Graph Description": soup.find("meta", {"property": "og:description"})['content'].strip()
+                                  if soup.find("meta", {"property": "og:description"}) else ""
+    }
+
+
+def extrair_alt_tags(soup):
+    return [img.get("alt", "").strip() for img in soup.find_all("img") if img.get("alt")]
+
+
+try:
+    import lxml  # noqa: F401
+    PARSER_HTML = "lxml"
+except ImportError:
+    PARSER_HTML = "html.parser"
+
+# Cada texto pertence só ao bloco mais próximo; o resto (span, strong, a...) é inline
+BLOCOS_HTML = frozenset([
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "div", "tr", "dd", "dt",
+    "blockquote", "figcaption", "section", "article", "header", "aside", "main", "body",
+])
+TAGS_IGNORADAS = frozenset(["footer", "nav", "script", "style", "noscript", "menu", "dialog"])
+HEADINGS = {f"h{i}": i for i in range(1, 7)}
+LINKS_IGNORADOS = {
+    '/#copy_link', '/#x', '/#facebook', '/#whatsapp',
+    'https://www.addtoany.com',
+    'https://www.nestle.be/fr/info/yourdata',
+    'https://www.onetrust.com/products/cookie-consent/'
+}
+# Textos de navegação que nunca são conteúdo (sementes do ModeloSite)
+PADROES_BOILERPLATE = [r"Previous Next", r"Anterior Siguiente"]
+_RE_BOILERPLATE = re.compile("|".join(PADROES_BOILERPLATE), re.IGNORECASE)
+
+ConteudoHtml = namedtuple("ConteudoHtml", ["blocos", "elementos", "imagens", "alt_tags"])
+
+
+@instrumentado("extrair_conteudo", lambda c, *a, **k: {
+    "blocos": len(c.blocos), "elementos": len(c.elementos), "imagens": len(c.imagens)})
+def extrair_conteudo(raiz, modelo=None):
+    """
+    Percorre a árvore uma única vez (iterativo, sem recursão) e retorna:
+    blocos de texto sem sobreposição e sem duplicatas, as linhas de
+    elementos (headings, negrito, itálico, links), imagens e alt tags.
+    Footer, nav, scripts etc. são pulados sem alterar a árvore. Padrões de
+    navegação e links ignorados vêm do ModeloSite (ou das sementes padrão).
+    """
+    from bs4 import Tag, NavigableString, CData
+
+    tipos_texto = (NavigableString, CData)
+    padroes = modelo.re_padroes if modelo else _RE_BOILERPLATE
+    links_ignorados = modelo.links_fixos if modelo else LINKS_IGNORADOS
+    blocos, vistos = [], set()
+    headings, negritos, italicos, links = [], [], [], []
+    imagens, alt_tags = [], []
+
+    def fechar_segmento(partes):
+        if not partes:
+            return
+        bruto = " ".join(partes)
+        partes.clear()
+        if padroes and padroes.search(bruto):
+            return
+        texto = clean_text(bruto)
+        if texto and texto not in vistos:
+            vistos.add(texto)
+            blocos.append(texto)
+
+    abertos = [[]]    # partes de texto de cada bloco aberto
+    coletores = []    # elementos inline abertos: [tag, partes]
+    pilha = [(raiz, False)]
+    while pilha:
+        no, fechando = pilha.pop()
+        if fechando:
+            if no.name in BLOCOS_HTML:
+                fechar_segmento(abertos.pop())
+            if coletores and coletores[-1][0] is no:
+                tag, partes = coletores.pop()
+                texto = clean_text(" ".join(partes))
+                if tag.name in HEADINGS:
+                    headings.append((HEADINGS[tag.name], texto))
+                elif tag.name in ("strong", "b"):
+                    negritos.append(texto)
+                elif tag.name in ("em", "i"):
+                    italicos.append(texto)
+                else:
+                    links.append((tag["href"].strip(), texto))
+            continue
+
+        if isinstance(no, Tag):
+            nome = no.name
+            if nome in TAGS_IGNORADAS and no is not raiz:
+                continue
+            if nome == "img":
+                alt = no.get("alt", "")
+                if alt:
+                    alt_tags.append(alt.strip())
+                src = no.get("src", "").strip()
+                # incluir só se vier do style que você quer
+                if alt.strip() and src and "/styles/ttt_image_510/" in src:
+                    imagens.append((src, clean_text(alt.strip())))
+            if nome in BLOCOS_HTML:
+                # O texto do pai antes deste bloco vira um segmento próprio
+                fechar_segmento(abertos[-1])
+                abertos.append([])
+            if nome in HEADINGS or nome in ("strong", "b", "em", "i") or (nome == "a" and no.has_attr("href")):
+                coletores.append([no, []])
+            pilha.append((no, True))
+            pilha.extend((filho, False) for filho in reversed(no.contents))
+        elif type(no) in tipos_texto:
+            texto = no.strip()
+            if texto:
+                abertos[-1].append(texto)
+                for _, partes in coletores:
+                    partes.append(texto)
+    for partes in abertos:
+        fechar_segmento(partes)
+
+    # Mesma ordem da planilha de sempre: h1..h6, negrito, itálico e links
+    elementos = [['Heading', f'h{nivel}', t, ''] for nivel, t in sorted(headings, key=lambda h: h[0]) if t]
+    elementos += [['Bold', '', t, ''] for t in negritos if t]
+    elementos += [['Italic', '', t, ''] for t in italicos if t]
+    for href, texto in links:
+        # filtra anchors vazios ou indesejados
+        if (not href
+            or href.startswith('#')
+            or href in links_ignorados
+            or (padroes and padroes.fullmatch(texto))):
+            continue
+        elementos.append(['Hyperlink', '', texto, href])
+    return ConteudoHtml(blocos, elementos, imagens, alt_tags)
+
+
+def _df_elementos(elementos):
+    return pd.DataFrame(elementos, columns=['Definição', 'Heading', 'Texto', 'Link'])
+
+
+@instrumentado("coletar_elementos_html", lambda df, *a, **k: {"elementos": len(df)})
+def coletar_elementos_html(main):
+    """Headings, negrito, itálico e hyperlinks do main (fora footer, nav etc.)."""
+    return _df_elementos(extrair_conteudo(main).elementos)
+
+
+def carregar_texto_docx(path):
+    return ler_docx(path).paragrafos
+
+
+# Perfis de renderização. "completo" é o comportamento original; "rapido"
+# bloqueia imagens/fontes/mídia e rastreadores e espera os seletores do
+# conteúdo em vez de networkidle + 1s; "estatico" nem abre o navegador.
+PERFIS_RENDER = {
+    "completo": {"javascript": True, "bloquear": False, "ate": "load", "espera": "networkidle",
+                 "seletores": None, "pausa_ms": 1000},
+    "rapido": {"javascript": True, "bloquear": True, "ate": "commit", "espera": "domcontentloaded",
+               "seletores": "main, a.accordion--text-v2, table.breed-table", "pausa_ms": 0},
+    "estatico": {"javascript": False},
+}
+RECURSOS_BLOQUEADOS = {"image", "media", "font"}
+DOMINIOS_BLOQUEADOS = (
+    "onetrust.com", "cookielaw.org", "addtoany.com", "googletagmanager.com",
+    "google-analytics.com", "doubleclick.net", "facebook.net", "hotjar.com",
+)
+TIMEOUT_NAVEGACAO = 60000
+TIMEOUT_SELETORES = 15000
+
+
+def _requisicao_bloqueada(request):
+    if request.resource_type in RECURSOS_BLOQUEADOS:
+        return True
+    host = urlparse(request.url).hostname or ""
+    return any(host == d or host.endswith("." + d) for d in DOMINIOS_BLOQUEADOS)
+
+
+def baixar_html_estatico(url):
+    """HTML servido pelo servidor, sem executar JavaScript."""
+    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (qatool)"})
+    with urllib.request.urlopen(req, timeout=TIMEOUT_NAVEGACAO / 1000) as resp:
+        charset = resp.headers.get_content_charset() or "utf-8"
+        return resp.read().decode(charset, errors="replace")
+
+
+def renderizar_pagina(url, perfil="completo", tempos=None):
+    """
+    Renderiza uma URL em um Chromium novo (modo avulso) e retorna o HTML.
+    Se tempos for uma lista, recebe um dict com os tempos da página.
+    """
+    cfg = PERFIS_RENDER[perfil]
+    marcas = {"url": url, "perfil": perfil}
+    inicio = time.perf_counter()
+    if not cfg["javascript"]:
+        html = baixar_html_estatico(url)
+        marcas["navegacao"] = time.perf_counter() - inicio
+    else:
+        from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            page = browser.new_page()
+            if cfg["bloquear"]:
+                page.route("**/*", lambda route: route.abort() if _requisicao_bloqueada(route.request)
+                           else route.continue_())
+            t0 = time.perf_counter()
+            page.goto(url, timeout=TIMEOUT_NAVEGACAO, wait_until=cfg["ate"])
+            t1 = time.perf_counter()
+            page.wait_for_load_state(cfg["espera"])
+            if cfg["seletores"]:
+                try:
+                    page.wait_for_selector(cfg["seletores"], state="attached", timeout=TIMEOUT_SELETORES)
+                except PlaywrightTimeoutError:
+                    pass
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            if cfg["pausa_ms"]:
+                page.wait_for_timeout(cfg["pausa_ms"])
+            t2 = time.perf_counter()
+            html = page.content()
+            browser.close()
+        marcas.update(inicializacao=t0 - inicio, navegacao=t1 - t0, espera=t2 - t1)
+    marcas["total"] = time.perf_counter() - inicio
+    if tempos is not None:
+        tempos.append(marcas)
+    return html
+
+
+DIR_CACHE_PADRAO = os.environ.get("QATOOL_CACHE", os.path.join(Path.home(), ".cache", "qatool"))
+VARREDURA_CACHE_A_CADA = 500  # gravações entre varreduras completas da pasta do cache
+FOLGA_CACHE = 0.9  # ao passar do limite, remove até esta fração dele (não varre a cada gravação)
+
+
+class CacheHtml:
+    """
+    Cache em disco do HTML renderizado, endereçado pelo hash de URL + perfil
+    de renderização. Entradas expiram após ttl segundos e as menos usadas
+    saem quando o total passa de tamanho_max bytes. O total é acompanhado a
+    cada gravação; a pasta só é varrida na primeira gravação, ao passar do
+    limite ou a cada VARREDURA_CACHE_A_CADA gravações (expiradas e arquivos
+    de outros processos).
+    atualizar=True ignora o que está salvo (e grava a nova renderização);
+    offline=True só reproduz o que está salvo, sem TTL, e falha se faltar.
+    """
+
+    def __init__(self, pasta=None, ttl=24 * 3600, tamanho_max=500 * 2**20, atualizar=False, offline=False):
+        self.pasta = Path(pasta or DIR_CACHE_PADRAO) / "html"
+        self.ttl = ttl
+        self.tamanho_max = tamanho_max
+        self.atualizar = atualizar
+        self.offline = offline
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self._total = None
+        self._gravacoes = 0
+
+    def chave(self, url, perfil):
+        config = json.dumps({"url": url, "perfil": perfil, "render": PERFIS_RENDER[perfil]}, sort_keys=True)
+        return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+    def _caminho(self, chave):
+        return self.pasta / chave[:2] / f"{chave}.html.gz"
+
+    def ler(self, url, perfil):
+        """HTML salvo ou None se ausente/expirado (no modo offline, ausente é erro)."""
+        caminho = self._caminho(self.chave(url, perfil))
+        if not caminho.exists():
+            if self.offline:
+                raise LookupError(f"Página fora do cache (modo offline): {url} [{perfil}]")
+            return None
+        info = caminho.stat()
+        if not self.offline and (self.atualizar or time.time() - info.st_mtime > self.ttl):
+            return None
+        with gzip.open(caminho, "rt", encoding="utf-8") as f:
+            html = f.read()
+        # atime marca o último uso (para a remoção por tamanho); mtime segue sendo a data da renderização
+        os.utime(caminho, (time.time(), info.st_mtime))
+        return html
+
+    def gravar(self, url, perfil, html):
+        if self.offline:
+            return
+        chave = self.chave(url, perfil)
+        caminho = self._caminho(chave)
+        caminho.parent.mkdir(exist_ok=True)
+        anterior = caminho.stat().st_size if caminho.exists() else 0
+        temporario = caminho.with_name(caminho.name + ".tmp")
+        with gzip.open(temporario, "wt", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(temporario, caminho)
+        with open(caminho.with_name(f"{chave}.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "url": url,
+                "perfil": perfil,
+                "renderizado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "sha256_html": hashlib.sha256(html.encode("utf-8")).hexdigest(),
+            }, f, ensure_ascii=False)
+        self._gravacoes += 1
+        if self._total is not None and self._gravacoes < VARREDURA_CACHE_A_CADA:
+            self._total += caminho.stat().st_size - anterior
+            if self._total <= self.tamanho_max:
+                return
+        self.limpar()
+
+    def limpar(self):
+        """Remove entradas expiradas e, se passar do limite, as menos usadas até FOLGA_CACHE dele."""
+        agora = time.time()
+        entradas, total = [], 0
+        for caminho in self.pasta.glob("*/*.html.gz"):
+            info = caminho.stat()
+            if agora - info.st_mtime > self.ttl:
+                self._remover(caminho)
+                continue
+            entradas.append((info.st_atime, info.st_size, caminho))
+            total += info.st_size
+        if total > self.tamanho_max:
+            for _, tamanho, caminho in sorted(entradas):
+                if total <= self.tamanho_max * FOLGA_CACHE:
+                    break
+                self._remover(caminho)
+                total -= tamanho
+        self._total, self._gravacoes = total, 0
+
+    @staticmethod
+    def _remover(caminho):
+        for p in (caminho, caminho.with_name(caminho.name.replace(".html.gz", ".json"))):
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def obter_html(url, perfil="completo", cache=None, tempos=None):
+    """HTML da página: do cache, se houver, senão renderizado (e salvo no cache)."""
+    html = cache.ler(url, perfil) if cache else None
+    if html is None:
+        marcas = []
+        anunciar_etapa("renderizar")
+        html = renderizar_pagina(url, perfil, marcas)
+        if cache:
+            cache.gravar(url, perfil, html)
+    else:
+        marcas = [{"url": url, "perfil": perfil, "cache": True, "total": 0.0}]
+    for nome, segundos in _etapas_render(marcas[0]):
+        registrar_etapa(nome, segundos, perfil=perfil)
+    if tempos is not None:
+        tempos.extend(marcas)
+    return html
+
+
+class PoolNavegador:
+    """
+    Mantém um Chromium aberto e entrega contextos isolados de um pool para
+    renderizar várias URLs em paralelo pela API assíncrona do Playwright.
+    A concorrência é o tamanho do pool; cada contexto é descartado e trocado
+    por um novo após o uso, para que cookies e storage não vazem entre páginas.
+    O navegador só sobe na primeira página fora do cache.
+    Os tempos de cada página ficam em self.tempos.
+
+        async with PoolNavegador(concorrencia=8, perfil="rapido") as nav:
+            html = await nav.renderizar(url)
+    """
+
+    def __init__(self, concorrencia=4, headless=True, perfil="completo", cache=None):
+        self.concorrencia = max(1, concorrencia)
+        self.headless = headless
+        self.perfil = perfil
+        self.cache = cache
+        self.tempos = []
+        self._cfg = PERFIS_RENDER[perfil]
+        self._playwright = None
+        self._browser = None
+        self._vagas = None
+        self._trava = None
+
+    async def __aenter__(self):
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+    async def iniciar(self):
+        # Cada vaga guarda um contexto pronto (ou None, antes do navegador subir)
+        self._vagas = asyncio.Queue()
+        self._trava = asyncio.Lock()
+        for _ in range(self.concorrencia):
+            self._vagas.put_nowait(None)
+
+    async def aquecer(self):
+        """Sobe o navegador e deixa um contexto pronto em cada vaga (modo serviço)."""
+        if not self._cfg["javascript"]:
+            return
+        vagas = [await self._vagas.get() for _ in range(self.concorrencia)]
+        for vaga in vagas:
+            self._vagas.put_nowait(vaga or await self._novo_contexto())
+
+    async def fechar(self):
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _navegador(self):
+        async with self._trava:
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        return self._browser
+
+    async def _novo_contexto(self):
+        contexto = await (await self._navegador()).new_context()
+        if self._cfg["bloquear"]:
+            async def filtrar(route):
+                if _requisicao_bloqueada(route.request):
+                    await route.abort()
+                else:
+                    await route.continue_()
+            await contexto.route("**/*", filtrar)
+        return contexto
+
+    async def renderizar(self, url):
+        """Mesmo fluxo de renderizar_pagina, reaproveitando o navegador aberto."""
+        html, _ = await self.renderizar_com_tempos(url)
+        return html
+
+    async def renderizar_com_tempos(self, url):
+        """Retorna (html, tempos da página)."""
+        cfg = self._cfg
+        marcas = {"url": url, "perfil": self.perfil}
+        if self.cache:
+            html = self.cache.ler(url, self.perfil)
+            if html is not None:
+                marcas.update(cache=True, total=0.0)
+                self.tempos.append(marcas)
+                return html, marcas
+
+        vaga = await self._vagas.get()
+        inicio = time.perf_counter()
+        try:
+            if not cfg["javascript"]:
+                html = await asyncio.to_thread(baixar_html_estatico, url)
+                marcas["navegacao"] = time.perf_counter() - inicio
+            else:
+                from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+                contexto, vaga = vaga or await self._novo_contexto(), None
+                try:
+                    page = await contexto.new_page()
+                    await page.goto(url, timeout=TIMEOUT_NAVEGACAO, wait_until=cfg["ate"])
+                    t1 = time.perf_counter()
+                    await page.wait_for_load_state(cfg["espera"])
+                    if cfg["seletores"]:
+                        try:
+                            await page.wait_for_selector(cfg["seletores"], state="attached",
+                                                         timeout=TIMEOUT_SELETORES)
+                        except PlaywrightTimeoutError:
+                            pass
+                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                    if cfg["pausa_ms"]:
+                        await page.wait_for_timeout(cfg["pausa_ms"])
+                    t2 = time.perf_counter()
+                    html = await page.content()
+                    marcas.update(navegacao=t1 - inicio, espera=t2 - t1)
+                finally:
+                    await contexto.close()
+                    vaga = await self._novo_contexto()
+        finally:
+            self._vagas.put_nowait(vaga)
+        marcas["total"] = time.perf_counter() - inicio
+        self.tempos.append(marcas)
+        if self.cache:
+            self.cache.gravar(url, self.perfil, html)
+        return html, marcas
+
+    async def renderizar_varias(self, urls):
+        """HTML de cada URL na ordem recebida; falhas voltam como a própria exceção."""
+        return await asyncio.gather(*(self.renderizar(u) for u in urls), return_exceptions=True)
+
+
+def renderizar_urls(urls, concorrencia=4, perfil="completo", tempos=None, cache=None):
+    """Versão síncrona de PoolNavegador.renderizar_varias."""
+    async def _rodar():
+        async with PoolNavegador(concorrencia, perfil=perfil, cache=cache) as nav:
+            try:
+                return await nav.renderizar_varias(urls)
+            finally:
+                if tempos is not None:
+                    tempos.extend(nav.tempos)
+    return asyncio.run(_rodar())
+
+
+# blocos: a parte de textos que veio do main (o resto é accordion/tabela)
+PaginaExtraida = namedtuple(
+    "PaginaExtraida", ["textos", "main", "metadados", "alt_tags", "titulo", "imagens", "elementos", "blocos"]
+)
+
+
+def extrair_pagina(html, modelo=None, arvore=True):
+    """
+    Extrai do HTML renderizado tudo o que o pipeline usa: o título do accordion
+    “Puntuación Veterinaria” pela <a class="accordion--text-v2">, a tabela dentro
+    da div específica, os blocos de texto úteis do main (ignorando o header
+    “Previous Next” que aparece junto ao título), metadados, imagens e elementos.
+    Com arvore=False, a árvore é desmontada ao fim (main vem None): a memória
+    volta na hora, sem esperar o coletor de ciclos.
+    """
+    from bs4 import BeautifulSoup
+
+    with etapa("extrair_pagina.parse", caracteres=len(html)):
+        soup = BeautifulSoup(html, PARSER_HTML)
+    textos = []
+
+    # 2) Captura título do accordion via <a class="accordion--text-v2">
+    for a_tag in soup.find_all("a", class_="accordion--text-v2"):
+        raw = clean_text(a_tag.get_text(" ", strip=True))
+        if raw:
+            textos.append(raw)
+
+    # 3) Localiza a div do accordion “Puntuación Veterinaria” e extrai a tabela, se existir
+    accordion_div = soup.find(
+        "div",
+        {
+            "class": "text-image--text-wrapper col-12 col-xl-5 order-3 order-xl-2"
+        }
+    )
+    if accordion_div:
+        tabela = accordion_div.find("table", {"class": "breed-table breed-table-col-2"})
+        if tabela:
+            for linha in tabela.find_all("tr"):
+                células = linha.find_all("td")
+                if len(células) >= 2:
+                    chave = clean_text(células[0].get_text(" ", strip=True))
+                    valor = clean_text(células[1].get_text(" ", strip=True))
+                    if chave and valor:
+                        textos.append(f"{chave}: {valor}")
+
+    # 4) Extrai metadados e define main
+    metadados = extrair_metadados(soup)
+    main = soup.find("main")
+    if not main or len(main.get_text(strip=True)) < 50:
+        main = soup.body
+
+    # 5) Uma passada pelo main: blocos, alt tags, imagens e elementos
+    conteudo = extrair_conteudo(main, modelo)
+    vistos = set(textos)
+    blocos = [t for t in conteudo.blocos if t not in vistos]
+    textos.extend(blocos)
+
+    titulo = soup.title.string.strip() if soup.title else "pagina"
+    if not arvore:
+        soup.decompose()
+        main = None
+    return PaginaExtraida(
+        textos, main, metadados, conteudo.alt_tags, titulo, conteudo.imagens, conteudo.elementos, blocos
+    )
+
+
+def carregar_pagina(url, html=None, perfil="completo", cache=None, modelo=None, arvore=True):
+    """
+    Renderiza (ou reaproveita html/cache) e extrai a página. Retorna PaginaExtraida.
+    """
+    # 1) Render JS e aguardar carregamento
+    if html is None:
+        html = obter_html(url, perfil, cache)
+    return extrair_pagina(html, modelo, arvore)
+
+
+def carregar_texto_url(url, html=None, perfil="completo", cache=None):
+    """
+    Carrega a página via Playwright e retorna
+    (textos, main, metadados, alt_tags, titulo, imagens).
+    Se o HTML já foi renderizado (ex.: pelo PoolNavegador), basta passá-lo em html;
+    com um CacheHtml, a renderização salva é reaproveitada.
+    """
+    return tuple(carregar_pagina(url, html, perfil, cache))[:6]
+
+
+# ---------------------- MODELO DO SITE ----------------------
+# Páginas do mesmo site repetem cabeçalho, banner de cookies, carrossel de
+# relacionados etc. Num lote, os blocos que aparecem em muitas páginas viram
+# template e saem dos candidatos antes do matching (evitam falsos Partial).
+
+class ModeloSite:
+    """
+    Template de um site. observar() acumula as impressões dos blocos e os
+    links de cada página; um bloco/link é template quando aparece em pelo
+    menos min_paginas páginas e em frequencia_min das páginas vistas. Cada
+    URL conta uma vez: observá-la de novo (outro lote com o mesmo modelo)
+    troca a contagem anterior dela pela nova.
+    links_fixos e padroes começam com LINKS_IGNORADOS e PADROES_BOILERPLATE.
+    contador é o vocabulário do site no lote (ver ajustar_vocabulario).
+    """
+
+    def __init__(self, dominio="", frequencia_min=0.5, min_paginas=3):
+        self.dominio = dominio
+        self.frequencia_min = frequencia_min
+        self.min_paginas = min_paginas
+        self.paginas = 0
+        self.blocos = Counter()   # impressão -> nº de páginas
+        self.exemplos = {}        # impressão -> texto, só para leitura do JSON
+        self.hrefs = Counter()
+        self.vistas = {}          # url -> (impressões, hrefs) já contados
+        self.links_fixos = set(LINKS_IGNORADOS)
+        self.padroes = list(PADROES_BOILERPLATE)
+        self.contador = None
+        self._compilar()
+
+    def _compilar(self):
+        self.re_padroes = re.compile("|".join(self.padroes), re.IGNORECASE) if self.padroes else None
+        self._repetidos = None
+
+    @staticmethod
+    def impressao(texto):
+        return hashlib.blake2b(normalizar(texto).encode("utf-8"), digest_size=8).hexdigest()
+
+    def observar(self, pagina, url=None):
+        """Conta os blocos do main e os links de uma PaginaExtraida (uma vez por url)."""
+        impressoes = {}
+        for texto in pagina.blocos:
+            impressoes.setdefault(self.impressao(texto), texto)
+        hrefs = {href for tipo, _, _, href in pagina.elementos if tipo == "Hyperlink"}
+        anterior = self.vistas.get(url) if url else None
+        if anterior:
+            self.blocos.subtract(anterior[0])
+            self.hrefs.subtract(anterior[1])
+            self.blocos += Counter()  # tira as contagens zeradas
+            self.hrefs += Counter()
+        else:
+            self.paginas += 1
+        for chave, texto in impressoes.items():
+            if chave not in self.blocos:
+                self.exemplos[chave] = texto[:200]
+            self.blocos[chave] += 1
+        self.hrefs.update(hrefs)
+        if url:
+            self.vistas[url] = (sorted(impressoes), sorted(hrefs))
+        self._repetidos = None
+
+    def repetidos(self):
+        """(impressões, hrefs) que contam como template."""
+        if self._repetidos is None:
+            minimo = max(self.min_paginas, self.frequencia_min * self.paginas)
+            self._repetidos = (
+                {k for k, n in self.blocos.items() if n >= minimo},
+                {h for h, n in self.hrefs.items() if n >= minimo},
+            )
+        return self._repetidos
+
+    def filtrar_blocos(self, blocos):
+        impressoes, _ = self.repetidos()
+        return [t for t in blocos if self.impressao(t) not in impressoes]
+
+    def filtrar_elementos(self, elementos):
+        _, hrefs = self.repetidos()
+        return [e for e in elementos if not (e[0] == "Hyperlink" and e[3] in hrefs)]
+
+    def candidatos(self, pagina):
+        """Textos da página para o matching: accordion/tabela e blocos fora do template."""
+        fixos = pagina.textos[:len(pagina.textos) - len(pagina.blocos)]
+        return fixos + self.filtrar_blocos(pagina.blocos)
+
+    def como_dict(self):
+        return {
+            "dominio": self.dominio,
+            "frequencia_min": self.frequencia_min,
+            "min_paginas": self.min_paginas,
+            "paginas": self.paginas,
+            "padroes": self.padroes,
+            "links_fixos": sorted(self.links_fixos),
+            "blocos": {k: [n, self.exemplos.get(k, "")] for k, n in self.blocos.most_common()},
+            "hrefs": dict(self.hrefs.most_common()),
+            "vistas": {url: {"blocos": b, "hrefs": h} for url, (b, h) in self.vistas.items()},
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        modelo = cls(dados.get("dominio", ""), dados.get("frequencia_min", 0.5), dados.get("min_paginas", 3))
+        modelo.paginas = dados.get("paginas", 0)
+        modelo.padroes = list(dados.get("padroes", PADROES_BOILERPLATE))
+        modelo.links_fixos = set(dados.get("links_fixos", LINKS_IGNORADOS))
+        for chave, (n, exemplo) in dados.get("blocos", {}).items():
+            modelo.blocos[chave] = n
+            modelo.exemplos[chave] = exemplo
+        modelo.hrefs.update(dados.get("hrefs", {}))
+        modelo.vistas = {url: (v["blocos"], v["hrefs"]) for url, v in dados.get("vistas", {}).items()}
+        modelo._compilar()
+        return modelo
+
+
+def dominio_da_url(url):
+    return urlparse(url).netloc.lower()
+
+
+def carregar_modelos(caminho):
+    """Modelos salvos por salvar_modelos ({domínio: ModeloSite}); vazio se o arquivo não existe."""
+    if not caminho or not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        dados = json.load(f)
+    return {dominio: ModeloSite.de_dict(m) for dominio, m in dados.get("sites", {}).items()}
+
+
+def salvar_modelos(caminho, modelos):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"sites": {d: m.como_dict() for d, m in modelos.items()}}, f, ensure_ascii=False, indent=2)
+
+
+@instrumentado("montar_modelos", lambda modelos, *a, **k: {"sites": len(modelos)})
+def montar_modelos(extraidos, modelos=None):
+    """
+    Observa as páginas extraídas do lote ([(url, ConteudoDocx, PaginaExtraida)])
+    e ajusta um vocabulário por site sobre todos os textos daquele site, para
+    não reajustar um por par. O IDF continua sendo o de cada página.
+    """
+    modelos = {} if modelos is None else modelos
+    textos = {}
+    for url, docx, pagina in extraidos:
+        dominio = dominio_da_url(url)
+        modelos.setdefault(dominio, ModeloSite(dominio)).observar(pagina, url)
+        textos.setdefault(dominio, []).extend(
+            [docx.textos, pagina.textos, pagina.alt_tags, [v for v in pagina.metadados.values() if v]]
+        )
+    for dominio, colecoes in textos.items():
+        modelos[dominio].contador = ajustar_vocabulario(*colecoes)
+    return modelos
+
+
+# ---------------------- MATCHING EM LOTE ----------------------
+# A TF-IDF original era reajustada em [consulta] + candidatos a cada parágrafo.
+# Aqui o vocabulário é ajustado uma vez por par documento/página, cada texto é
+# transformado uma única vez e as similaridades saem de um produto esparso.
+# O IDF de cada consulta é reproduzido exatamente (a consulta entra no corpus),
+# então os scores são os mesmos da versão parágrafo a parágrafo.
+
+PREFIXOS_IGNORADOS = [
+    "in dit artikel", "title tag:", "meta description:", "og title:", "og description:",
+    "[alt text da imagem]", "alt tag :", "title tag", "meta description",
+    "open graph title", "open graph description", "-- meta --", "en:", "be-fr:",
+    "guide des races de chiens", "alt-tag:", "-- meta –", "title tag", "Etiqueta alt: ", "Etiqueta alt:"
+]
+
+TAMANHO_BLOCO_CONSULTAS = 512
+
+# Modo aproximado: abaixo de LIMIAR_EXAUSTIVO pares consulta x candidato a
+# busca exaustiva é barata e continua sendo usada mesmo com aproximado=True
+LIMIAR_EXAUSTIVO = 250_000
+TAMANHO_LISTA_CURTA = 32
+# Termos presentes em mais que essa fração dos candidatos ficam fora do índice.
+# Com 0.05 o melhor bloco de 3-5% dos parágrafos ficava fora da lista curta
+# (só dividia termos comuns com eles); com 0.2 o top-1 bate com o exaustivo em
+# 99% ou mais dos parágrafos e em todos os de status Partial ou melhor
+# (python benchmark.py matching)
+FRACAO_DF_INDICE = 0.2
+
+
+def classificar_status(score):
+    if score >= 0.85:
+        return "Exact"
+    elif score >= 0.75:
+        return "Similar"
+    elif score >= 0.4:
+        return "Partial"
+    return "Missing"
+
+
+def ajustar_vocabulario(*colecoes):
+    """
+    Ajusta um único vocabulário (mesmo tokenizador e stop words da TF-IDF)
+    sobre todos os textos das coleções. Retorna None se não houver termos.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    textos = [b.normalizado for col in colecoes for b in normalizar_lote(col)]
+    contador = CountVectorizer(stop_words='english')
+    try:
+        contador.fit([t for t in textos if t])
+    except ValueError:
+        return None
+    return contador
+
+
+def _contagens(textos, contador):
+    """
+    Igual a contador.transform(textos) para o CountVectorizer de
+    ajustar_vocabulario, sem o analisador do sklearn: tokeniza com o mesmo
+    token_pattern e descarta o que não está no vocabulário (stop words
+    inclusive). Outras configurações usam o transform.
+    """
+    params = contador.get_params()
+    if (params["analyzer"] != "word" or params["ngram_range"] != (1, 1) or params["tokenizer"]
+            or params["preprocessor"] or params["strip_accents"] or params["binary"]):
+        return contador.transform(textos).astype(np.float64).tocsr()
+    achar = re.compile(params["token_pattern"]).findall
+    vocabulario = contador.vocabulary_
+    termos, tamanhos = [], []
+    for texto in textos:
+        ids = [i for i in map(vocabulario.get, achar(texto.lower() if params["lowercase"] else texto))
+               if i is not None]
+        termos.extend(ids)
+        tamanhos.append(len(ids))
+    indptr = np.zeros(len(textos) + 1, dtype=np.int64)
+    np.cumsum(tamanhos, out=indptr[1:])
+    matriz = sparse.csr_matrix((np.ones(len(termos)), np.asarray(termos, dtype=np.int64), indptr),
+                               shape=(len(textos), len(vocabulario)))
+    matriz.sum_duplicates()
+    return matriz
+
+
+def _vetorizar(blocos, contador):
+    """Transforma cada Bloco uma vez; retorna (índices não vazios, contagens)."""
+    limpos = [b.normalizado for b in blocos]
+    validos = [i for i, t in enumerate(limpos) if t]
+    if not validos:
+        return validos, sparse.csr_matrix((0, len(contador.vocabulary_)), dtype=np.float64)
+    return validos, _contagens([limpos[i] for i in validos], contador)
+
+
+def _parametros_idf(candidatos):
+    """IDF de um termo fora e dentro da consulta, no corpus [consulta] + candidatos."""
+    n_docs = candidatos.shape[0] + 1
+    df = np.bincount(candidatos.indices, minlength=candidatos.shape[1])
+    idf_fora = np.log((1 + n_docs) / (1 + df)) + 1
+    idf_dentro = np.log((1 + n_docs) / (2 + df)) + 1
+    return df, idf_fora, idf_dentro
+
+
+def similaridades_tfidf(consultas, candidatos):
+    """
+    Matriz consultas x candidatos com o cosseno que uma TfidfVectorizer
+    (smooth_idf, norma l2) ajustada em [consulta] + candidatos daria para cada
+    consulta. Recebe matrizes de contagens no mesmo vocabulário.
+    """
+    # Termos presentes na consulta ganham +1 no df do corpus daquela consulta
+    _, idf_fora, idf_dentro = _parametros_idf(candidatos)
+
+    pesos_q = consultas @ sparse.diags(idf_dentro)
+    norma_q = np.sqrt(np.asarray(pesos_q.multiply(pesos_q).sum(axis=1)).ravel())
+
+    quadrados_c = candidatos.multiply(candidatos).tocsr()
+    norma_base_c = quadrados_c @ (idf_fora ** 2)
+    presenca_q = (consultas > 0).astype(np.float64)
+    ajuste_c = presenca_q @ sparse.diags(idf_fora ** 2 - idf_dentro ** 2) @ quadrados_c.T
+    norma_c = np.sqrt(np.maximum(norma_base_c[None, :] - ajuste_c.toarray(), 0.0))
+
+    produto = (pesos_q @ sparse.diags(idf_dentro) @ candidatos.T).toarray()
+    denominador = norma_q[:, None] * norma_c
+    return np.divide(produto, denominador, out=np.zeros_like(produto), where=denominador > 0)
+
+
+def top_k(sims, k=1):
+    """Índices e scores dos k maiores por linha; com k=1 mantém o desempate do argmax."""
+    if k == 1:
+        idx = sims.argmax(axis=1)[:, None]
+    else:
+        idx = np.argsort(-sims, axis=1, kind="stable")[:, :k]
+    return idx, np.take_along_axis(sims, idx, axis=1)
+
+
+def listas_curtas(consultas, candidatos, tamanho=TAMANHO_LISTA_CURTA, fracao_df=FRACAO_DF_INDICE):
+    """
+    Índice invertido termo -> candidatos (só termos raros o bastante) e, para
+    cada consulta, os candidatos com maior sobreposição ponderada por IDF.
+    Retorna uma lista de arrays de índices de candidatos (ordenados); vazia
+    quando a consulta só tem termos comuns demais para o índice.
+    """
+    df, idf_fora, _ = _parametros_idf(candidatos)
+    raros = (df > 0) & (df <= max(1, fracao_df * candidatos.shape[0]))
+    pesos_c = candidatos @ sparse.diags(idf_fora * raros)
+    norma = np.sqrt(np.asarray(pesos_c.multiply(pesos_c).sum(axis=1)).ravel())
+    pesos_c = sparse.diags(np.divide(1.0, norma, out=np.zeros_like(norma), where=norma > 0)) @ pesos_c
+    indice = pesos_c.T.tocsr()  # termo -> candidatos
+    presenca_q = (consultas > 0).astype(np.float64) @ sparse.diags(idf_fora * raros)
+
+    listas = []
+    for inicio in range(0, consultas.shape[0], TAMANHO_BLOCO_CONSULTAS):
+        sobreposicao = (presenca_q[inicio:inicio + TAMANHO_BLOCO_CONSULTAS] @ indice).tocsr()
+        for i in range(sobreposicao.shape[0]):
+            linha = slice(sobreposicao.indptr[i], sobreposicao.indptr[i + 1])
+            cols, dados = sobreposicao.indices[linha], sobreposicao.data[linha]
+            if len(cols) > tamanho:
+                cols = cols[np.argpartition(-dados, tamanho - 1)[:tamanho]]
+            listas.append(np.sort(cols))
+    return listas
+
+
+def similaridades_pares(consultas, candidatos, linhas, colunas):
+    """
+    O mesmo cosseno de similaridades_tfidf, mas só para os pares
+    (consultas[linhas[k]], candidatos[colunas[k]]).
+    """
+    _, idf_fora, idf_dentro = _parametros_idf(candidatos)
+    pesos_q = consultas @ sparse.diags(idf_dentro)
+    norma_q = np.sqrt(np.asarray(pesos_q.multiply(pesos_q).sum(axis=1)).ravel())
+
+    quadrados_c = candidatos.multiply(candidatos).tocsr()
+    norma_base_c = quadrados_c @ (idf_fora ** 2)
+    presenca_q = (consultas > 0).astype(np.float64) @ sparse.diags(idf_fora ** 2 - idf_dentro ** 2)
+    ajuste = np.asarray(presenca_q[linhas].multiply(quadrados_c[colunas]).sum(axis=1)).ravel()
+    norma_c = np.sqrt(np.maximum(norma_base_c[colunas] - ajuste, 0.0))
+
+    produto = np.asarray((pesos_q @ sparse.diags(idf_dentro))[linhas].multiply(candidatos[colunas]).sum(axis=1)).ravel()
+    denominador = norma_q[linhas] * norma_c
+    return np.divide(produto, denominador, out=np.zeros_like(produto), where=denominador > 0)
+
+
+def _melhores_aproximados(mat_q, mat_c):
+    """
+    (índice, score) do melhor candidato de cada consulta, calculando o cosseno
+    exato só na lista curta. Consultas sem lista curta caem na busca exaustiva.
+    """
+    listas = listas_curtas(mat_q, mat_c)
+    melhores = np.zeros(mat_q.shape[0], dtype=np.int64)
+    scores = np.zeros(mat_q.shape[0])
+
+    com_lista = [i for i, cols in enumerate(listas) if len(cols)]
+    if com_lista:
+        tamanhos = [len(listas[i]) for i in com_lista]
+        linhas = np.repeat(com_lista, tamanhos)
+        colunas = np.concatenate([listas[i] for i in com_lista])
+        sims = similaridades_pares(mat_q, mat_c, linhas, colunas)
+        inicio = 0
+        for i, n in zip(com_lista, tamanhos):
+            # Colunas ordenadas: o argmax mantém o desempate da busca exaustiva
+            k = int(np.argmax(sims[inicio:inicio + n]))
+            melhores[i], scores[i] = colunas[inicio + k], sims[inicio + k]
+            inicio += n
+
+    sem_lista = [i for i, cols in enumerate(listas) if not len(cols)]
+    for inicio in range(0, len(sem_lista), TAMANHO_BLOCO_CONSULTAS):
+        bloco = sem_lista[inicio:inicio + TAMANHO_BLOCO_CONSULTAS]
+        idx, sc = top_k(similaridades_tfidf(mat_q[bloco], mat_c))
+        melhores[bloco], scores[bloco] = idx[:, 0], sc[:, 0]
+    return melhores, scores
+
+
+def melhores_matches(consultas, candidatos, contador=None, aproximado=False):
+    """
+    Versão em lote de safe_best_match: retorna [(melhor_texto, similaridade)]
+    na ordem das consultas, ou ("", 0.0) quando não há texto útil.
+    Aceita textos ou Blocos já normalizados. Com aproximado=True e mais de
+    LIMIAR_EXAUSTIVO pares, só a lista curta de cada consulta é pontuada.
+    """
+    consultas, candidatos = normalizar_lote(consultas), normalizar_lote(candidatos)
+    resultados = [("", 0.0)] * len(consultas)
+    if contador is None:
+        contador = ajustar_vocabulario(consultas, candidatos)
+    if contador is None or not consultas or not candidatos:
+        return resultados
+
+    idx_q, mat_q = _vetorizar(consultas, contador)
+    idx_c, mat_c = _vetorizar(candidatos, contador)
+    if not idx_q or not idx_c:
+        return resultados
+
+    # Sem nenhum termo em [consulta] + candidatos a TF-IDF daria "empty vocabulary"
+    candidatos_vazios = mat_c.nnz == 0
+    termos_q = np.diff(mat_q.indptr)
+    if aproximado and len(idx_q) * len(idx_c) > LIMIAR_EXAUSTIVO:
+        blocos = [_melhores_aproximados(mat_q, mat_c)]
+    else:
+        blocos = (
+            (idx[:, 0], sc[:, 0])
+            for idx, sc in (
+                top_k(similaridades_tfidf(mat_q[inicio:inicio + TAMANHO_BLOCO_CONSULTAS], mat_c))
+                for inicio in range(0, len(idx_q), TAMANHO_BLOCO_CONSULTAS)
+            )
+        )
+    j = 0
+    for melhores, scores in blocos:
+        for m, sc in zip(melhores, scores):
+            if not (candidatos_vazios and termos_q[j] == 0):
+                resultados[idx_q[j]] = (candidatos[idx_c[m]].texto, float(sc))
+            j += 1
+    return resultados
+
+
+def safe_best_match(query, candidates, aproximado=False):
+    """
+    Retorna (melhor_texto, similaridade) ou ("", 0.0).
+    Evita erro de "empty vocabulary" quando não há texto útil.
+    """
+    return melhores_matches([query], list(candidates), aproximado=aproximado)[0]
+
+
+def recall_aproximado(consultas, candidatos, contador=None):
+    """
+    Compara o modo aproximado com o exaustivo (ignorando LIMIAR_EXAUSTIVO):
+    fração das consultas com o mesmo melhor score (recall), a mesma fração só
+    entre as que teriam ao menos status Partial (recall_relevante) e a maior
+    perda de similaridade.
+    """
+    consultas, candidatos = normalizar_lote(consultas), normalizar_lote(candidatos)
+    if contador is None:
+        contador = ajustar_vocabulario(consultas, candidatos)
+    if contador is None:
+        return {"consultas": 0, "recall": 1.0, "recall_relevante": 1.0, "perda_max": 0.0}
+    idx_q, mat_q = _vetorizar(consultas, contador)
+    _, mat_c = _vetorizar(candidatos, contador)
+    if not idx_q or not mat_c.shape[0]:
+        return {"consultas": 0, "recall": 1.0, "recall_relevante": 1.0, "perda_max": 0.0}
+    exato = np.concatenate([
+        top_k(similaridades_tfidf(mat_q[i:i + TAMANHO_BLOCO_CONSULTAS], mat_c))[1][:, 0]
+        for i in range(0, len(idx_q), TAMANHO_BLOCO_CONSULTAS)
+    ])
+    _, aproximado = _melhores_aproximados(mat_q, mat_c)
+    perda = exato - aproximado
+    relevantes = exato >= 0.4
+    return {
+        "consultas": len(idx_q),
+        "recall": float(np.mean(perda <= 1e-9)),
+        "recall_relevante": float(np.mean(perda[relevantes] <= 1e-9)) if relevantes.any() else 1.0,
+        "perda_max": float(perda.max(initial=0.0)),
+    }
+
+
+def classificar_paragrafos(lista_docx):
+    """
+    Separa os parágrafos que viram linha da comparação: [(índice, tipo, Bloco)],
+    tipo "alt" (o Bloco é só o texto depois de "alt-tag:") ou "texto".
+    Vazios e prefixos de PREFIXOS_IGNORADOS ficam de fora.
+    """
+    linhas = []
+    for i, bloco in enumerate(normalizar_lote(lista_docx)):
+        texto_doc, texto_limpo = bloco
+        if not texto_doc.strip():
+            continue
+        if any(texto_limpo.startswith(p) for p in PREFIXOS_IGNORADOS):
+            continue
+        if texto_limpo.startswith("alt-tag"):
+            original_alt = texto_doc.split(":", 1)[1].strip()
+            linhas.append((i, "alt", Bloco(original_alt, normalizar(original_alt))))
+        else:
+            linhas.append((i, "texto", bloco))
+    return linhas
+
+
+@instrumentado("comparar_textos", lambda df, lista_docx, lista_html, metadados, alt_tags, *a, **k: {
+    "paragrafos": len(lista_docx), "blocos": len(lista_html), "alt_tags": len(alt_tags),
+    "candidatos": len(lista_html) + len(alt_tags) + sum(bool(v.strip()) for v in metadados.values()),
+    "linhas": len(df)})
+def comparar_textos(lista_docx, lista_html, metadados, alt_tags, aproximado=False, contador=None):
+    # Cada texto é limpo e normalizado uma única vez para todo o matching
+    lista_html = normalizar_lote(lista_html)
+    alt_tags = normalizar_lote(alt_tags)
+
+    # 1) Classifica os parágrafos: ignorados, alt-tags e textos (metadados ou HTML)
+    linhas = [(tipo, bloco) for _, tipo, bloco in classificar_paragrafos(lista_docx)]
+
+    consultas_alt = [b for tipo, b in linhas if tipo == "alt"]
+    consultas_txt = [b for tipo, b in linhas if tipo == "texto"]
+    campos_meta = [(k, Bloco(v, normalizar(v))) for k, v in metadados.items() if v.strip()]
+
+    # 2) Um vocabulário para o par inteiro: parágrafos, blocos, alts e metadados
+    # (ou o do site, que contém todos esses termos: os scores não mudam)
+    if contador is None:
+        contador = ajustar_vocabulario(
+            consultas_alt, consultas_txt, lista_html, alt_tags, [b for _, b in campos_meta]
+        )
+    res_alt = melhores_matches(consultas_alt, alt_tags, contador)
+    # Cada campo de metadado é um corpus de um único candidato, como antes
+    sims_meta = {k: [s for _, s in melhores_matches(consultas_txt, [v], contador)] for k, v in campos_meta}
+
+    # 3) Decide quais textos batem com metadados; o resto vai contra os blocos HTML
+    tipos_meta = []
+    for i, (texto_doc, _) in enumerate(consultas_txt):
+        tipo_meta = next((k for k, v in metadados.items() if v and texto_doc.strip() == v.strip()), None)
+        if not tipo_meta:
+            melhor_meta, melhor_score_mt = "", 0.0
+            for k, _ in campos_meta:
+                if sims_meta[k][i] > melhor_score_mt:
+                    melhor_score_mt = sims_meta[k][i]
+                    melhor_meta = k
+            if melhor_score_mt > 0.85:
+                tipo_meta = melhor_meta
+        tipos_meta.append(tipo_meta)
+
+    pendentes = [i for i, tipo_meta in enumerate(tipos_meta) if not tipo_meta]
+    res_html = dict.fromkeys(pendentes, ("", 0.0))
+    if lista_html:
+        res_html.update(zip(pendentes, melhores_matches(
+            [consultas_txt[i] for i in pendentes], lista_html, contador, aproximado=aproximado)))
+
+    # 4) Monta o resultado na ordem original do documento
+    resultados = []
+    iter_alt, iter_txt = iter(res_alt), iter(range(len(consultas_txt)))
+    for tipo, (texto, _) in linhas:
+        if tipo == "alt":
+            match_text, score = next(iter_alt)
+        else:
+            i = next(iter_txt)
+            tipo_meta = tipos_meta[i]
+            if tipo_meta:
+                match_text, score = metadados[tipo_meta], sims_meta[tipo_meta][i]
+            else:
+                match_text, score = res_html[i]
+        resultados.append({
+            "Document Text": texto,
+            "Webpage Match": match_text,
+            "Status": classificar_status(score),
+            "Similarity": round(score * 100, 1)
+        })
+
+    return pd.DataFrame(resultados, columns=COLUNAS_COMPARACAO)
+
+
+# Italic-Bold Check: igualdade exata por hash; depois a mesma chave sem
+# caixa/pontuação/espaços extras; por fim n-gramas de caracteres (Near)
+LIMIAR_DESTAQUE_PROXIMO = 0.8
+_RE_PONTUACAO = re.compile(r'[^\w\s]+')
+_RE_BRANCOS = re.compile(r'\s+')
+
+
+def chave_destaque(texto):
+    """Chave de comparação das frases destacadas: sem caixa, pontuação nem espaços extras."""
+    return _RE_BRANCOS.sub(" ", _RE_PONTUACAO.sub(" ", texto.casefold())).strip()
+
+
+def _normalizar_linhas(matriz):
+    norma = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+    return (sparse.diags(np.divide(1.0, norma, out=np.zeros_like(norma), where=norma > 0)) @ matriz).tocsr()
+
+
+def _destaques_proximos(consultas, candidatos):
+    """
+    (índice, cosseno) do candidato mais parecido com cada consulta, em
+    trigramas de caracteres. Em listas grandes só a lista curta (índice
+    invertido dos trigramas raros) é pontuada; sem lista curta, score 0.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    contador = CountVectorizer(analyzer="char_wb", ngram_range=(3, 3))
+    try:
+        contador.fit(candidatos + consultas)
+    except ValueError:
+        return np.zeros(len(consultas), dtype=np.int64), np.zeros(len(consultas))
+    contagens_q = contador.transform(consultas).astype(np.float64)
+    contagens_c = contador.transform(candidatos).astype(np.float64)
+    mat_q, mat_c = _normalizar_linhas(contagens_q), _normalizar_linhas(contagens_c)
+
+    if len(consultas) * len(candidatos) <= LIMIAR_EXAUSTIVO:
+        idx, sc = top_k((mat_q @ mat_c.T).toarray())
+        return idx[:, 0], sc[:, 0]
+
+    melhores = np.zeros(len(consultas), dtype=np.int64)
+    scores = np.zeros(len(consultas))
+    # Trigramas se repetem muito: só os bem raros entram no índice
+    listas = listas_curtas(contagens_q, contagens_c, tamanho=8, fracao_df=0.05)
+    com_lista = [i for i, cols in enumerate(listas) if len(cols)]
+    if com_lista:
+        tamanhos = [len(listas[i]) for i in com_lista]
+        linhas = np.repeat(com_lista, tamanhos)
+        colunas = np.concatenate([listas[i] for i in com_lista])
+        sims = np.asarray(mat_q[linhas].multiply(mat_c[colunas]).sum(axis=1)).ravel()
+        inicio = 0
+        for i, n in zip(com_lista, tamanhos):
+            k = int(np.argmax(sims[inicio:inicio + n]))
+            melhores[i], scores[i] = colunas[inicio + k], sims[inicio + k]
+            inicio += n
+    return melhores, scores
+
+
+@instrumentado("verificar_destaques", lambda df, frases, textos_pagina, *a, **k: {
+    "frases": len(frases), "elementos": len(textos_pagina),
+    **df["Status"].value_counts().to_dict()})
+def verificar_destaques(frases, textos_pagina):
+    """
+    Procura cada frase em negrito/itálico do DOCX entre os textos da página.
+    Present: texto igual; Near: igual a menos de caixa, pontuação e espaços, ou
+    cosseno de trigramas de caracteres >= LIMIAR_DESTAQUE_PROXIMO; senão Missing.
+    """
+    exatos, por_chave = set(), {}
+    for t in textos_pagina:
+        t = str(t)
+        exatos.add(t)
+        por_chave.setdefault(chave_destaque(t), t)
+    por_chave.pop("", None)
+
+    resultados = []
+    pendentes = []
+    for frase in frases:
+        chave = chave_destaque(frase)
+        if frase in exatos:
+            resultados.append([frase, frase, "Present", 100.0])
+        elif chave in por_chave:
+            resultados.append([frase, por_chave[chave], "Near", 100.0])
+        else:
+            resultados.append([frase, "", "Missing", 0.0])
+            if chave:
+                pendentes.append((len(resultados) - 1, chave))
+
+    # Quase iguais: só as frases sem acerto por hash, contra as chaves únicas da página
+    if pendentes and por_chave:
+        chaves = list(por_chave)
+        melhores, scores = _destaques_proximos([c for _, c in pendentes], chaves)
+        for (n, _), m, sc in zip(pendentes, melhores, scores):
+            if sc >= LIMIAR_DESTAQUE_PROXIMO:
+                resultados[n][1:] = [por_chave[chaves[m]], "Near", round(float(sc) * 100, 1)]
+
+    return pd.DataFrame(resultados, columns=["From doc", "At URL", "Status", "Similarity"])
+
+
 def gerar_resumo(df):
-    total = len(df)
-    resumo = df["Status"].value_counts().reindex(
-        ["Exact", "Similar", "Partial", "Missing"], fill_value=0
-    )
-    porcentagens = (resumo / total * 100).round(1) if total > 0 else [0, 0, 0, 0]
-    df_resumo = pd.DataFrame({
-        "Status": resumo.index,
-        "Quantidade": resumo.values,
-        "Porcentagem": porcentagens.values
-    })
+    total = len(df)
+    resumo = df["Status"].value_counts().reindex(
+        ["Exact", "Similar", "Partial", "Missing"], fill_value=0
+    )
+    porcentagens = (resumo / total * 100).round(1) if total > 0 else resumo * 0.0
+    df_resumo = pd.DataFrame({
+        "Status": resumo.index,
+        "Quantidade": resumo.values,
+        "Porcentagem": porcentagens.values
+    })
     df_resumo.loc[len(df_resumo.index)] = ["TOTAL", total, f"{100 if total > 0 else 0}%"]
     return df_resumo
 
 
-# ---------------------- EXTRAÇÃO DE TEXTO EM NEGRITO ----------------------
-def extract_bold_phrases(doc_path):
-    """Agrupa runs, tabelas e caixas de texto para capturar frases completas em negrito."""
-    doc = Document(doc_path)
-    ns = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
-
-    def runs_to_phrases(runs):
-        texts, curr = [], []
-        for r in runs:
-            rPr = r.find("w:rPr", ns)
-            bold = rPr is not None and rPr.find("w:b", ns) is not None
-            t = r.find("w:t", ns)
-            if bold and t is not None and t.text.strip():
-                curr.append(t.text.strip())
-            else:
-                if curr:
-                    texts.append(" ".join(curr))
-                    curr = []
-        if curr:
-            texts.append(" ".join(curr))
-        return texts
-
-    phrases = []
-    for para in doc.paragraphs:
-        phrases += runs_to_phrases([r._element for r in para.runs])
-    for tbl in doc.tables:
-        for row in tbl.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    phrases += runs_to_phrases([r._element for r in para.runs])
-    for txbx in doc.element.body.findall('.//w:txbxContent', ns):
-        for p in txbx.findall('.//w:p', ns):
-            phrases += runs_to_phrases(p.findall('.//w:r', ns))
+# ---------------------- EXECUÇÕES INCREMENTAIS ----------------------
+# O resultado de uma linha só depende do parágrafo e do conjunto de
+# candidatos da página (blocos, metadados e alt tags: o IDF vem deles).
+# O armazém guarda cada linha pela dupla de hashes; numa nova execução só
+# os parágrafos novos, ou todos se a página mudou, são pontuados de novo.
+
+COLUNAS_COMPARACAO = ["Document Text", "Webpage Match", "Status", "Similarity"]
+COLUNAS_MUDANCAS = ["Tipo", "Status", "Texto", "Antes", "Depois"]
+
+
+def _hash_texto(*partes):
+    return hashlib.sha256(json.dumps(partes, ensure_ascii=False).encode("utf-8")).hexdigest()[:32]
+
+
+class ArmazemExecucoes:
+    """
+    Armazém SQLite das execuções. Só guarda o caminho (a conexão é aberta a
+    cada uso), então pode ir para os processos do lote; o modo WAL deixa
+    vários processos gravarem no mesmo arquivo.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""CREATE TABLE IF NOT EXISTS linhas (
+                hash_pagina TEXT, hash_paragrafo TEXT, match TEXT, similaridade REAL, status TEXT,
+                PRIMARY KEY (hash_pagina, hash_paragrafo))""")
+            con.execute("""CREATE TABLE IF NOT EXISTS execucoes (
+                chave TEXT PRIMARY KEY, hash_pagina TEXT, paragrafos TEXT, blocos TEXT, quando REAL)""")
+
+    def _conectar(self):
+        return sqlite3.connect(self.caminho, timeout=60)
+
+    @staticmethod
+    def hash_pagina(lista_html, metadados, alt_tags, aproximado=False):
+        return _hash_texto(list(lista_html), sorted(metadados.items()), list(alt_tags), aproximado)
+
+    @instrumentado("comparar_incremental", lambda res, *a, **k: {
+        "reaproveitadas": res[2], "recalculadas": res[3]})
+    def comparar(self, chave, lista_docx, lista_html, metadados, alt_tags, aproximado=False, contador=None):
+        """
+        comparar_textos com reaproveitamento. Retorna (df da comparação,
+        df das mudanças desde a execução anterior da mesma chave ou None,
+        linhas reaproveitadas, linhas recalculadas).
+        """
+        h_pagina = self.hash_pagina(lista_html, metadados, alt_tags, aproximado)
+        classificados = classificar_paragrafos(lista_docx)
+        hashes = [_hash_texto(tipo, bloco.texto) for _, tipo, bloco in classificados]
+
+        with self._conectar() as con:
+            anterior = con.execute(
+                "SELECT hash_pagina, paragrafos, blocos FROM execucoes WHERE chave = ?", (chave,)).fetchone()
+            guardadas = self._linhas(con, h_pagina, hashes)
+
+            # Só os parágrafos sem linha guardada para esta página passam pelo matching
+            pendentes = [n for n, h in enumerate(hashes) if h not in guardadas]
+            if pendentes:
+                df_novas = comparar_textos([lista_docx[classificados[n][0]] for n in pendentes],
+                                           lista_html, metadados, alt_tags, aproximado=aproximado,
+                                           contador=contador)
+                novas = {hashes[n]: (m, sim, st) for n, (m, st, sim) in zip(
+                    pendentes, df_novas[["Webpage Match", "Status", "Similarity"]].itertuples(index=False))}
+                con.executemany(
+                    "INSERT OR REPLACE INTO linhas VALUES (?, ?, ?, ?, ?)",
+                    [(h_pagina, h, m, sim, st) for h, (m, sim, st) in novas.items()])
+                guardadas.update(novas)
+
+            df = pd.DataFrame(
+                [[bloco.texto, guardadas[h][0], guardadas[h][2], guardadas[h][1]]
+                 for (_, _, bloco), h in zip(classificados, hashes)],
+                columns=COLUNAS_COMPARACAO,
+            )
+
+            paragrafos = {h: bloco.texto for (_, _, bloco), h in zip(classificados, hashes)}
+            blocos = {_hash_texto(t): t for t in lista_html}
+            mudancas = None
+            if anterior:
+                paragrafos_antes, blocos_antes = json.loads(anterior[1]), json.loads(anterior[2])
+                antes = self._linhas(con, anterior[0], list(paragrafos_antes)) if anterior[0] != h_pagina else None
+                mudancas = self._mudancas(paragrafos, paragrafos_antes, guardadas, antes, blocos, blocos_antes)
+            con.execute("INSERT OR REPLACE INTO execucoes VALUES (?, ?, ?, ?, ?)", (
+                chave, h_pagina, json.dumps(paragrafos, ensure_ascii=False),
+                json.dumps({h: t[:300] for h, t in blocos.items()}, ensure_ascii=False), time.time()))
+        return df, mudancas, len(hashes) - len(pendentes), len(pendentes)
+
+    @staticmethod
+    def _linhas(con, h_pagina, hashes):
+        guardadas = {}
+        unicos = list(set(hashes))
+        for inicio in range(0, len(unicos), 500):
+            parte = unicos[inicio:inicio + 500]
+            guardadas.update(
+                (h, (m, sim, st)) for h, m, sim, st in con.execute(
+                    f"SELECT hash_paragrafo, match, similaridade, status FROM linhas WHERE hash_pagina = ? "
+                    f"AND hash_paragrafo IN ({','.join('?' * len(parte))})", [h_pagina, *parte]))
+        return guardadas
+
+    @staticmethod
+    def _mudancas(paragrafos, paragrafos_antes, agora, antes, blocos, blocos_antes):
+        """
+        Parágrafos que entraram/saíram, linhas que mudaram de status (quando a
+        página mudou) e blocos da página que entraram/saíram.
+        """
+        linhas = []
+        for h, texto in paragrafos.items():
+            if h not in paragrafos_antes:
+                linhas.append(["Paragraph", "Added", texto, "", agora[h][2]])
+            elif antes is not None and h in antes and antes[h][2] != agora[h][2]:
+                linhas.append(["Paragraph", "Changed", texto, antes[h][2], agora[h][2]])
+        linhas += [["Paragraph", "Removed", t, "", ""] for h, t in paragrafos_antes.items() if h not in paragrafos]
+        linhas += [["Page block", "Added", t, "", ""] for h, t in blocos.items() if h not in blocos_antes]
+        linhas += [["Page block", "Removed", t, "", ""] for h, t in blocos_antes.items() if h not in blocos]
+        return pd.DataFrame(linhas, columns=COLUNAS_MUDANCAS)
+
+
+# ---------------------- LEITURA DO DOCX ----------------------
+# Uma única passada incremental (iterparse) pelo XML principal do pacote:
+# parágrafos, linhas de tabela, caixas de texto e frases em negrito/itálico.
+# Cada filho do <w:body> é descartado assim que processado, então a memória
+# não cresce com o tamanho do documento.
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+_REL_DOCUMENTO = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+ConteudoDocx = namedtuple(
+    "ConteudoDocx", ["paragrafos", "textos", "negrito", "italico", "tabelas", "caixas_texto"]
+)
+
+
+def _parte_principal(pacote):
+    """Caminho do document.xml dentro do pacote (normalmente word/document.xml)."""
+    try:
+        rels = ET.fromstring(pacote.read("_rels/.rels"))
+        for rel in rels:
+            if rel.get("Type") == _REL_DOCUMENTO:
+                return rel.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+
+def _texto_run(r):
+    # Mesmo texto que o python-docx dá para um run
+    partes = []
+    for e in r:
+        if e.tag == W + "t":
+            partes.append(e.text or "")
+        elif e.tag in (W + "tab", W + "ptab"):
+            partes.append("\t")
+        elif e.tag == W + "br":
+            partes.append("\n" if e.get(W + "type", "textWrapping") == "textWrapping" else "")
+        elif e.tag == W + "cr":
+            partes.append("\n")
+        elif e.tag == W + "noBreakHyphen":
+            partes.append("-")
+    return "".join(partes)
+
+
+def _texto_paragrafo(p):
+    partes = []
+    for filho in p:
+        if filho.tag == W + "r":
+            partes.append(_texto_run(filho))
+        elif filho.tag == W + "hyperlink":
+            partes.extend(_texto_run(r) for r in filho.findall(W + "r"))
+    return "".join(partes)
+
+
+def _frases_formatadas(runs, marca):
+    """Agrupa runs consecutivos com a marca (w:b ou w:i) em frases completas."""
+    texts, curr = [], []
+    for r in runs:
+        rPr = r.find(W + "rPr")
+        formatado = rPr is not None and rPr.find(marca) is not None
+        t = r.find(W + "t")
+        if formatado and t is not None and t.text and t.text.strip():
+            curr.append(t.text.strip())
+        else:
+            if curr:
+                texts.append(" ".join(curr))
+                curr = []
+    if curr:
+        texts.append(" ".join(curr))
+    return texts
+
+
+def _unicas(frases):
+    seen, unique = set(), []
+    for ph in frases:
+        norm = re.sub(r"\s+", " ", ph).strip()
+        if norm and norm not in seen:
+            seen.add(norm)
+            unique.append(norm)
+    return unique
+
+
+@instrumentado("ler_docx", lambda c, *a, **k: {
+    "paragrafos": len(c.paragrafos), "linhas_tabela": len(c.tabelas), "caixas_texto": len(c.caixas_texto),
+    "negrito": len(c.negrito), "italico": len(c.italico)})
+def ler_docx(path):
+    """
+    Lê o .docx uma única vez e retorna ConteudoDocx:
+    paragrafos  - parágrafos do corpo, limpos (o que carregar_texto_docx sempre retornou)
+    textos      - parágrafos do corpo + linhas de tabela, na ordem do documento
+    negrito     - frases em negrito do corpo, tabelas e caixas de texto (sem repetição)
+    italico     - idem, em itálico
+    tabelas     - linhas de tabela ("chave: valor" em linhas de duas células)
+    caixas_texto - parágrafos das caixas de texto
+    """
+    brutos, textos, tabelas, caixas = [], [], [], []
+    negrito = {"corpo": [], "tabela": [], "caixa": []}
+    italico = {"corpo": [], "tabela": [], "caixa": []}
+    pilha, linhas, celulas = [], [], []
+    corpo, em_caixa, em_fallback = None, 0, 0
+
+    def formatacao(origem, runs):
+        negrito[origem] += _frases_formatadas(runs, W + "b")
+        italico[origem] += _frases_formatadas(runs, W + "i")
+
+    with zipfile.ZipFile(path) as pacote, pacote.open(_parte_principal(pacote)) as xml:
+        for evento, el in ET.iterparse(xml, events=("start", "end")):
+            tag = el.tag
+            if evento == "start":
+                pilha.append(tag)
+                if tag == W + "body":
+                    corpo = el
+                elif tag == W + "txbxContent":
+                    em_caixa += 1
+                elif tag == MC_FALLBACK:
+                    em_fallback += 1
+                elif tag == W + "tr":
+                    linhas.append([])
+                elif tag == W + "tc":
+                    celulas.append([])
+                continue
+
+            pilha.pop()
+            pai = pilha[-1] if pilha else None
+            if tag == W + "txbxContent":
+                em_caixa -= 1
+            elif tag == MC_FALLBACK:
+                em_fallback -= 1
+            elif tag == W + "p":
+                if em_caixa:
+                    # A mesma caixa vem em mc:Choice e no VML de mc:Fallback; basta uma
+                    if not em_fallback:
+                        formatacao("caixa", el.iter(W + "r"))
+                        texto = clean_text(_texto_paragrafo(el))
+                        if texto:
+                            caixas.append(texto)
+                elif pai == W + "tc":
+                    formatacao("tabela", el.findall(W + "r"))
+                    celulas[-1].append(_texto_paragrafo(el))
+                elif pai == W + "body":
+                    formatacao("corpo", el.findall(W + "r"))
+                    texto = _texto_paragrafo(el)
+                    if texto.strip():
+                        brutos.append(texto)
+                        textos.append(clean_text(texto))
+            elif tag == W + "tc":
+                linhas[-1].append(clean_text("\n".join(celulas.pop())))
+            elif tag == W + "tr":
+                valores = [c for c in linhas.pop() if c]
+                linha = f"{valores[0]}: {valores[1]}" if len(valores) == 2 else " ".join(valores)
+                if linha:
+                    tabelas.append(linha)
+                    textos.append(linha)
+
+            if pai == W + "body" and corpo is not None:
+                el.clear()
+                corpo.remove(el)
+
+    return ConteudoDocx(
+        limpar_lote(brutos),
+        textos,
+        _unicas(negrito["corpo"] + negrito["tabela"] + negrito["caixa"]),
+        _unicas(italico["corpo"] + italico["tabela"] + italico["caixa"]),
+        tabelas,
+        caixas,
+    )
+
+
+@instrumentado("extract_bold_phrases", lambda frases, *a, **k: {"frases": len(frases)})
+def extract_bold_phrases(doc_path):
+    """Agrupa runs, tabelas e caixas de texto para capturar frases completas em negrito."""
+    return ler_docx(doc_path).negrito
+# ---------------------------------------------------------------------------
+
+
+CORES_STATUS = {
+    "Exact": "C6EFCE",
+    "Similar": "FFEB9C",
+    "Partial": "F4B084",
+    "Missing": "F8CBAD"
+}
+CORES_BOLD = {"Present": "C6EFCE", "Near": "FFEB9C", "Missing": "F8CBAD"}
+CORES_MUDANCAS = {"Added": "C6EFCE", "Changed": "FFEB9C", "Removed": "F8CBAD"}
 
-    seen, unique = set(), []
-    for ph in phrases:
-        norm = re.sub(r"\s+", " ", ph).strip()
-        if norm and norm not in seen:
-            seen.add(norm)
-            unique.append(norm)
-    return unique
-# ---------------------------------------------------------------------------
-
-
-def salvar_em_excel(df_comparacao, df_resumo, df_elementos, df_imagens, metadados, page_url, nome_arquivo="comparacao_resultado.xlsx", word_path=None):
-    wb = Workbook()
-
-    def estilizar(ws, colorir=False):
-        # Estiliza cabeçalho
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        # Ajusta largura das colunas
-        for col in ws.columns:
-            ws.column_dimensions[col[0].column_letter].width = 25
-        # Pinta as células conforme status, se colorir=True
-        if colorir:
-            cores = {
-                "Exact": "C6EFCE",
-                "Similar": "FFEB9C",
-                "Partial": "F4B084",
-                "Missing": "F8CBAD"
-            }
-            status_idx = next((i + 1 for i, cell in enumerate(ws[1]) if cell.value == "Status"), None)
-            if status_idx:
-                for row in ws.iter_rows(min_row=2):
-                    status = row[status_idx - 1].value
-                    cor = cores.get(status, "FFFFFF")
-                    for cell in row:
-                        cell.fill = PatternFill(start_color=cor, end_color=cor, fill_type="solid")
-
-    # Aba 1: Comparacao
-    aba1 = wb.active
-    aba1.title = "Comparacao"
-    for row in dataframe_to_rows(df_comparacao, index=False, header=True):
-        aba1.append(row)
-    estilizar(aba1, colorir=True)
-
-    # Aba 2: Resumo
-    aba2 = wb.create_sheet("Resumo")
-    for row in dataframe_to_rows(df_resumo, index=False, header=True):
-        aba2.append(row)
-    estilizar(aba2)
-
-    # Aba 3: Elementos da Pagina
-    aba3 = wb.create_sheet("Elementos da Pagina")
-    for row in dataframe_to_rows(df_elementos, index=False, header=True):
-        aba3.append(row)
-    estilizar(aba3)
-
-    # Aba 4: Imagens
-    aba4 = wb.create_sheet("Imagens")
-    for row in dataframe_to_rows(df_imagens, index=False, header=True):
-        aba4.append(row)
-    estilizar(aba4)
-
- # Aba 5: Metadados
-    aba5 = wb.create_sheet("Metadados")
-    headers_meta = ["Page URL", "Title Tag", "Meta Description", "OG Title", "OG Description"]
-    aba5.append(headers_meta)
-    for cell in aba5[1]:
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-    aba5.append([
-        page_url,
-        metadados.get("Title Tag", ""),
-        metadados.get("Meta Description", ""),
-        metadados.get("Open Graph Title", ""),
-        metadados.get("Open Graph Description", "")
-    ])
+
+@lru_cache(maxsize=None)
+def _estilos_cabecalho():
+    """Fonte e fundo do cabeçalho, compartilhados por todas as células (nada é criado por célula)."""
+    from openpyxl.styles import Font, PatternFill
+
+    return Font(bold=True), PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+
+
+def _linha_cabecalho(ws, colunas):
+    from openpyxl.cell import WriteOnlyCell
+
+    fonte, fundo = _estilos_cabecalho()
+    linha = []
+    for valor in colunas:
+        cell = WriteOnlyCell(ws, value=valor)
+        cell.font = fonte
+        cell.fill = fundo
+        linha.append(cell)
+    return linha
+
+
+def _colorir_por_status(ws, colunas, n_linhas, cores):
+    """Pinta as linhas pelo valor da coluna Status com formatação condicional."""
+    if "Status" not in colunas or not n_linhas:
+        return
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import PatternFill
+    from openpyxl.utils import get_column_letter
+
+    letra_status = get_column_letter(list(colunas).index("Status") + 1)
+    intervalo = f"A2:{get_column_letter(len(colunas))}{n_linhas + 1}"
+    for status, cor in cores.items():
+        ws.conditional_formatting.add(intervalo, FormulaRule(
+            formula=[f'${letra_status}2="{status}"'],
+            fill=PatternFill(start_color=cor, end_color=cor, fill_type="solid"),
+        ))
+
+
+def escrever_aba(wb, titulo, df, largura=25, cores=None):
+    """
+    Escreve o DataFrame em uma aba de um Workbook write-only: cabeçalho em
+    negrito/azul, largura fixa e, com cores, linhas coloridas pelo Status.
+    """
+    from openpyxl.utils import get_column_letter
+
+    ws = wb.create_sheet(titulo)
+    colunas = list(df.columns)
+    for i in range(1, len(colunas) + 1):
+        ws.column_dimensions[get_column_letter(i)].width = largura
+    ws.append(_linha_cabecalho(ws, colunas))
+    for linha in df.itertuples(index=False, name=None):
+        ws.append(linha)
+    if cores:
+        _colorir_por_status(ws, colunas, len(df), cores)
+    return ws
+
+
+@instrumentado("salvar_em_excel", lambda _, df_comparacao, df_resumo, df_elementos, df_imagens, *a, **k: {
+    "linhas": len(df_comparacao) + len(df_resumo) + len(df_elementos) + len(df_imagens)})
+def salvar_em_excel(df_comparacao, df_resumo, df_elementos, df_imagens, metadados, page_url, nome_arquivo="comparacao_resultado.xlsx", word_path=None, frases_negrito=None, df_mudancas=None,
+                    df_destaques=None):
+    from openpyxl import Workbook
+
+    # Workbook write-only: as linhas vão direto para o arquivo
+    wb = Workbook(write_only=True)
+
+    # Aba 1: Comparacao
+    escrever_aba(wb, "Comparacao", df_comparacao, cores=CORES_STATUS)
+
+    # Aba 2: Resumo
+    escrever_aba(wb, "Resumo", df_resumo)
+
+    # Aba 3: Elementos da Pagina
+    escrever_aba(wb, "Elementos da Pagina", df_elementos)
+
+    # Aba 4: Imagens
+    escrever_aba(wb, "Imagens", df_imagens)
+
+    # Aba 5: Metadados
+    aba5 = wb.create_sheet("Metadados")
     for col, width in zip(["A","B","C","D","E"], [50,30,50,30,50]):
         aba5.column_dimensions[col].width = width
+    headers_meta = ["Page URL", "Title Tag", "Meta Description", "OG Title", "OG Description"]
+    aba5.append(_linha_cabecalho(aba5, headers_meta))
+    aba5.append([
+        page_url,
+        metadados.get("Title Tag", ""),
+        metadados.get("Meta Description", ""),
+        metadados.get("Open Graph Title", ""),
+        metadados.get("Open Graph Description", "")
+    ])
 
     # ---- Nova aba: Italic-Bold Check ----
-    if word_path:
-        bold_list = extract_bold_phrases(word_path)
-        els = df_elementos["Texto"].astype(str).tolist()
-        linhas = [
-            {
-                "From doc": t,
-                "At URL": t if t in els else "",
-                "Status": "Present" if t in els else "Missing",
-            }
-            for t in bold_list
-        ]
-        if linhas:
-            aba6 = wb.create_sheet("Italic-Bold Check")
-            df_bold = pd.DataFrame(linhas)
-            for row in dataframe_to_rows(df_bold, index=False, header=True):
-                aba6.append(row)
-            for cell in aba6[1]:
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-            for col in aba6.columns:
-                aba6.column_dimensions[col[0].column_letter].width = 40
-            cores_bold = {"Present": "C6EFCE", "Missing": "F8CBAD"}
-            status_idx = 3
-            for row in aba6.iter_rows(min_row=2):
-                status = row[status_idx - 1].value
-                cor = cores_bold.get(status, "FFFFFF")
-                for cell in row:
-                    cell.fill = PatternFill(start_color=cor, end_color=cor, fill_type="solid")
+    if df_destaques is None and (frases_negrito is not None or word_path):
+        bold_list = frases_negrito if frases_negrito is not None else extract_bold_phrases(word_path)
+        if bold_list:
+            df_destaques = verificar_destaques(bold_list, df_elementos["Texto"].tolist())
+    if df_destaques is not None and len(df_destaques):
+        escrever_aba(wb, "Italic-Bold Check", df_destaques, largura=40, cores=CORES_BOLD)
+
+    # ---- Mudanças desde a execução anterior (com ArmazemExecucoes) ----
+    if df_mudancas is not None:
+        escrever_aba(wb, "Mudancas", df_mudancas, largura=40, cores=CORES_MUDANCAS)
 
     wb.save(nome_arquivo)
-
-# ---------------------- INTERFACE ----------------------
-
-def executar_comparador():
-    root = Tk()
-    root.title("Comparador de Documentos")
-    root.geometry("450x350")
-
-    Label(root, text="Escolha o modo de comparação:", font=("Arial", 12)).pack(pady=10)
-    Button(root, text="Single Page", width=30, command=lambda: comparar_um(root)).pack(pady=10)
-    Button(root, text="Multiple Pages", width=30, command=lambda: comparar_varios(root)).pack(pady=10)
-    root.mainloop()
-
-
-def comparar_um(root):
-    docx_path = filedialog.askopenfilename(
-        title="Selecione o arquivo .docx", filetypes=[("Word", "*.docx")]
-    )
-    if not docx_path:
-        return
-    url = simpledialog.askstring("URL", "Insira a URL correspondente:")
-    if not url:
-        return
-    pasta = filedialog.askdirectory(title="Selecione a pasta de saída")
-    if not pasta:
-        return
-
-    try:
-        docx_txt = carregar_texto_docx(docx_path)
-        html_txt, main, meta, alts, titulo, imagens = carregar_texto_url(url)
-        df1 = comparar_textos(docx_txt, html_txt, meta, alts)
-        df1 = df1[df1["Document Text"].str.strip() != ""]
-        df2 = gerar_resumo(df1)
-        df3 = coletar_elementos_html(main)
-        df4 = pd.DataFrame(imagens, columns=["Image URL", "Image Alt"])
-        nome = re.sub(r'[\\/:*?"<>|]', '', titulo)[:50]
-        salvar_em_excel(
-            df1,
-            df2,
-            df3,
-            df4,
-            meta,
-            url,
-            os.path.join(pasta, f"comparacao_{nome}.xlsx"),
-            word_path=docx_path,
+
+# ---------------------- VERIFICAÇÃO DE LINKS ----------------------
+# Confere se os hyperlinks e as imagens extraídos respondem: HEAD (GET se o
+# servidor recusar o HEAD) em conexões keep-alive reaproveitadas por host,
+# em várias threads. Cada URL é conferida uma vez por lote e o resultado
+# fica em cache por ttl segundos (em disco, se houver arquivo).
+
+TIMEOUT_LINK = 10
+MAX_REDIRECIONAMENTOS = 5
+STATUS_REDIRECIONAMENTO = {301, 302, 303, 307, 308}
+
+
+def url_verificavel(base, href):
+    """URL absoluta (sem fragmento) de um href/src, ou None se não for http(s)."""
+    if not href or href.startswith("#"):
+        return None
+    url = urldefrag(urljoin(base, href.strip())).url
+    return url if urlsplit(url).scheme in ("http", "https") else None
+
+
+def links_da_pagina(url, pagina, modelo=None):
+    """URLs a conferir de uma PaginaExtraida: os links dos elementos e as imagens."""
+    elementos = modelo.filtrar_elementos(pagina.elementos) if modelo else pagina.elementos
+    hrefs = [e[3] for e in elementos] + [src for src, _ in pagina.imagens]
+    return list(dict.fromkeys(u for u in (url_verificavel(url, h) for h in hrefs) if u))
+
+
+def anotar_links(df, coluna, base, links):
+    """Acrescenta HTTP Status e Latency (ms) ao DataFrame pela URL da coluna."""
+    resultados = [links.get(url_verificavel(base, v)) for v in df[coluna]]
+    df["HTTP Status"] = [r["status"] if r else None for r in resultados]
+    df["Latency (ms)"] = [r["latencia"] if r else None for r in resultados]
+    return df
+
+
+class VerificadorLinks:
+    """
+    Verificador compartilhado por um lote (ou sessão):
+
+        verificador = VerificadorLinks(concorrencia=16, ttl=3600)
+        verificador.verificar(urls)  # {url: {"status": 200, "latencia": 35}}
+
+    status é o código HTTP final (depois de até MAX_REDIRECIONAMENTOS) ou o
+    nome da exceção (TimeoutError, ConnectionRefusedError...); latencia em
+    ms. A mesma URL pedida por várias páginas ao mesmo tempo é conferida uma
+    só vez. Com arquivo, o cache é lido na criação e gravado em salvar().
+    """
+
+    def __init__(self, concorrencia=16, ttl=24 * 3600, timeout=TIMEOUT_LINK, arquivo=None):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.arquivo = arquivo
+        self._threads = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="links")
+        self._local = threading.local()
+        self._trava = threading.Lock()
+        self._pendentes = {}
+        self._resultados = {}
+        self.pedidas = set()
+        if arquivo and os.path.exists(arquivo):
+            with open(arquivo, encoding="utf-8") as f:
+                self._resultados = {u: tuple(v) for u, v in json.load(f).items()}
+
+    def verificar(self, urls):
+        """{url: {"status", "latencia"}} de cada URL (use url_verificavel antes)."""
+        futuros = {url: self._enviar(url) for url in dict.fromkeys(urls)}
+        self.pedidas.update(futuros)
+        return {url: futuro.result() for url, futuro in futuros.items()}
+
+    def quebrados(self):
+        """{url: status} das URLs pedidas que falharam ou responderam 4xx/5xx."""
+        with self._trava:
+            status = {url: self._resultados[url][1]["status"] for url in self.pedidas if url in self._resultados}
+        return {url: s for url, s in status.items() if isinstance(s, str) or s >= 400}
+
+    def salvar(self):
+        if not self.arquivo:
+            return
+        with self._trava:
+            agora = time.time()
+            validos = {u: v for u, v in self._resultados.items() if agora - v[0] < self.ttl}
+        os.makedirs(os.path.dirname(os.path.abspath(self.arquivo)), exist_ok=True)
+        with open(self.arquivo, "w", encoding="utf-8") as f:
+            json.dump(validos, f, ensure_ascii=False)
+
+    def fechar(self):
+        self._threads.shutdown(wait=True)
+        self.salvar()
+
+    def _enviar(self, url):
+        with self._trava:
+            salvo = self._resultados.get(url)
+            if salvo and time.time() - salvo[0] < self.ttl:
+                futuro = Future()
+                futuro.set_result(salvo[1])
+                return futuro
+            if url not in self._pendentes:
+                self._pendentes[url] = self._threads.submit(self._verificar, url)
+            return self._pendentes[url]
+
+    def _verificar(self, url):
+        inicio = time.perf_counter()
+        atual = url
+        status = None
+        try:
+            for _ in range(MAX_REDIRECIONAMENTOS + 1):
+                status, destino = self._requisitar("HEAD", atual)
+                if status >= 400:
+                    # Há servidores que recusam ou erram no HEAD
+                    status, destino = self._requisitar("GET", atual)
+                if status not in STATUS_REDIRECIONAMENTO or not destino:
+                    break
+                atual = urljoin(atual, destino)
+        except Exception as e:
+            # Qualquer falha (rede, URL inválida...) vale só para este link
+            status = type(e).__name__
+        finally:
+            # Mesmo se a thread for interrompida, a URL não fica presa em _pendentes
+            with self._trava:
+                self._pendentes.pop(url, None)
+                if status is not None:
+                    resultado = {"status": status, "latencia": round((time.perf_counter() - inicio) * 1000)}
+                    self._resultados[url] = (time.time(), resultado)
+        return resultado
+
+    def _requisitar(self, metodo, url):
+        """(status, Location) numa conexão keep-alive desta thread para o host da URL."""
+        partes = urlsplit(url)
+        # http.client só aceita ASCII: host em IDNA, caminho e query em %-encoding
+        host = partes.hostname.encode("idna").decode("ascii")
+        chave = (partes.scheme, host, partes.port)
+        conexoes = self._local.__dict__.setdefault("conexoes", {})
+        caminho = quote(partes.path or "/", safe="/%:@!$&'()*+,;=-._~")
+        if partes.query:
+            caminho += "?" + quote(partes.query, safe="/?%:@!$&'()*+,;=-._~")
+        for tentativa in range(2):
+            if chave not in conexoes:
+                classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+                conexoes[chave] = classe(host, partes.port, timeout=self.timeout)
+            conexao = conexoes[chave]
+            try:
+                conexao.request(metodo, caminho, headers={"User-Agent": "Mozilla/5.0 (qatool)"})
+                resposta = conexao.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # O servidor fechou a conexão ociosa: tenta uma vez numa conexão nova
+                conexoes.pop(chave).close()
+                if tentativa:
+                    raise
+                continue
+            except Exception:
+                conexoes.pop(chave).close()
+                raise
+            if metodo == "HEAD" and not resposta.will_close:
+                resposta.read()
+            else:
+                # O corpo do GET (uma imagem, por exemplo) não é baixado
+                conexoes.pop(chave).close()
+            return resposta.status, resposta.getheader("Location")
+
+
+# ---------------------- PIPELINE ----------------------
+
+def nome_arquivo_saida(titulo, url=None):
+    """
+    Nome do .xlsx a partir do título (cortado em 50 caracteres). Com url, um
+    sufixo curto do hash da URL evita que páginas de mesmo título se sobrescrevam.
+    """
+    nome = re.sub(r'[\\/:*?"<>|]', '', titulo)[:50]
+    if url:
+        nome = f"{nome}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+    return f"comparacao_{nome}.xlsx"
+
+
+def extrair_par(docx_path, url, html=None, perfil="completo", cache=None, modelo=None):
+    """
+    Lê o DOCX (uma única vez: textos com as linhas de tabela e negritos) e
+    extrai a página. A árvore do HTML é liberada logo após a extração.
+    """
+    docx = ler_docx(docx_path)
+    pagina = carregar_pagina(url, html=html, perfil=perfil, cache=cache, modelo=modelo, arvore=False)
+    return docx, pagina
+
+
+ResultadoPar = namedtuple(
+    "ResultadoPar", ["comparacao", "resumo", "elementos", "imagens", "metadados", "destaques", "mudancas", "titulo"]
+)
+
+
+def comparar_par(docx, pagina, docx_path, url, aproximado=False, modelo=None, armazem=None, links=None):
+    """
+    Matching e tabelas de um par já extraído (ver processar_par). Retorna
+    ResultadoPar com os DataFrames de cada aba (destaques/mudancas podem ser None).
+    links ({url: resultado} de VerificadorLinks) ganha colunas em Elementos e Imagens.
+    """
+    candidatos, elementos, contador = pagina.textos, pagina.elementos, None
+    if modelo:
+        candidatos = modelo.candidatos(pagina)
+        elementos = modelo.filtrar_elementos(elementos)
+        contador = modelo.contador
+    df_mudancas = None
+    if armazem:
+        chave = f"{Path(docx_path).resolve()}|{url}"
+        df1, df_mudancas, _, _ = armazem.comparar(chave, docx.textos, candidatos, pagina.metadados,
+                                                  pagina.alt_tags, aproximado, contador)
+    else:
+        df1 = comparar_textos(docx.textos, candidatos, pagina.metadados, pagina.alt_tags,
+                              aproximado=aproximado, contador=contador)
+    df1 = df1[df1["Document Text"].str.strip() != ""]
+    df3 = _df_elementos(elementos)
+    df_destaques = verificar_destaques(docx.negrito, df3["Texto"].tolist()) if docx.negrito else None
+    df4 = pd.DataFrame(pagina.imagens, columns=["Image URL", "Image Alt"])
+    if links is not None:
+        anotar_links(df3, "Link", url, links)
+        anotar_links(df4, "Image URL", url, links)
+    return ResultadoPar(
+        df1, gerar_resumo(df1), df3, df4, pagina.metadados, df_destaques, df_mudancas, pagina.titulo,
+    )
+
+
+def salvar_resultado(resultado, url, pasta, nome_saida=None):
+    """Grava o .xlsx de um ResultadoPar e retorna o caminho."""
+    if nome_saida:
+        nome = nome_saida if nome_saida.lower().endswith(".xlsx") else f"{nome_saida}.xlsx"
+    else:
+        nome = nome_arquivo_saida(resultado.titulo, url)
+    destino = os.path.join(pasta, nome)
+    salvar_em_excel(resultado.comparacao, resultado.resumo, resultado.elementos, resultado.imagens,
+                    resultado.metadados, url, destino, df_destaques=resultado.destaques,
+                    df_mudancas=resultado.mudancas)
+    return destino
+
+
+def processar_par(docx_path, url, pasta, nome_saida=None, html=None, perfil="completo", cache=None,
+                  aproximado=False, modelo=None, extraido=None, armazem=None, verificador=None):
+    """
+    Executa o pipeline completo para um par DOCX/URL e retorna o caminho do .xlsx.
+    Sem nome_saida, o arquivo recebe o título da página; com html, a página
+    já renderizada é usada no lugar de abrir um navegador. aproximado liga as
+    listas curtas do matching em páginas grandes (ver melhores_matches).
+    Com um ModeloSite, os blocos e links de template ficam fora do matching;
+    extraido é o (ConteudoDocx, PaginaExtraida) de extrair_par, se já existir.
+    Com um ArmazemExecucoes, só as linhas novas são pontuadas e a planilha
+    ganha a aba Mudancas em relação à execução anterior do mesmo par. Com um
+    VerificadorLinks, links e imagens ganham HTTP Status e Latency (ms).
+    """
+    docx, pagina = extraido or extrair_par(docx_path, url, html, perfil, cache, modelo)
+    links = None
+    if verificador:
+        with etapa("verificar_links") as info:
+            urls = links_da_pagina(url, pagina, modelo)
+            links = verificador.verificar(urls)
+            info["links"] = len(urls)
+    resultado = comparar_par(docx, pagina, docx_path, url, aproximado, modelo, armazem, links)
+    return salvar_resultado(resultado, url, pasta, nome_saida)
+
+# ---------------------- RESULTADOS CONSOLIDADOS ----------------------
+# Em vez de abrir centenas de .xlsx: todas as linhas de todas as páginas num
+# único dataset (JSONL ou Parquet) com a página em cada registro, e uma
+# planilha consolidada opcional. Os registros vêm dos processos do lote e são
+# gravados à medida que chegam; só as contagens por status ficam em memória.
+
+# tabela -> [(coluna, tipo)]; "pagina" e "docx" vêm antes em todos os registros
+TABELAS_RESULTADO = {
+    "comparacao": [("Document Text", "texto"), ("Webpage Match", "texto"), ("Status", "texto"),
+                   ("Similarity", "numero")],
+    "elementos": [("Definição", "texto"), ("Heading", "texto"), ("Texto", "texto"), ("Link", "texto"),
+                  ("HTTP Status", "texto"), ("Latency (ms)", "numero")],
+    "imagens": [("Image URL", "texto"), ("Image Alt", "texto"), ("HTTP Status", "texto"),
+                ("Latency (ms)", "numero")],
+    "metadados": [("Title Tag", "texto"), ("Meta Description", "texto"), ("Open Graph Title", "texto"),
+                  ("Open Graph Description", "texto")],
+    "destaques": [("From doc", "texto"), ("At URL", "texto"), ("Status", "texto"), ("Similarity", "numero")],
+}
+STATUS_COMPARACAO = ["Exact", "Similar", "Partial", "Missing"]
+
+
+def registros_do_resultado(resultado):
+    """{tabela: [linhas]} de um ResultadoPar, nas colunas de TABELAS_RESULTADO."""
+    tabelas = {
+        "comparacao": resultado.comparacao,
+        "elementos": resultado.elementos,
+        "imagens": resultado.imagens,
+        "metadados": pd.DataFrame([resultado.metadados]),
+        "destaques": resultado.destaques,
+    }
+    registros = {}
+    for nome, colunas in TABELAS_RESULTADO.items():
+        df = tabelas[nome]
+        if df is None or df.empty:
+            registros[nome] = []
+            continue
+        df = df.reindex(columns=[c for c, _ in colunas])
+        registros[nome] = [
+            [None if v is None or v != v else (float(v) if tipo == "numero" else str(v))
+             for v, (_, tipo) in zip(linha, colunas)]
+            for linha in df.itertuples(index=False, name=None)
+        ]
+    return registros
+
+
+class DatasetResultados:
+    """
+    Dataset do lote. Caminho terminado em .parquet: uma pasta com um arquivo
+    Parquet por tabela (precisa do pyarrow); senão, um JSONL único em que
+    cada linha traz "tabela", "pagina", "docx" e as colunas da tabela.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        self.parquet = self.caminho.lower().endswith(".parquet")
+        self._escritores = {}
+        if self.parquet:
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Dataset em Parquet precisa do pacote pyarrow (pip install pyarrow)")
+            os.makedirs(self.caminho, exist_ok=True)
+            self._arquivo = None
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+            self._arquivo = open(self.caminho, "w", encoding="utf-8")
+
+    def _esquema(self, tabela):
+        import pyarrow
+
+        tipos = {"texto": pyarrow.string(), "numero": pyarrow.float64()}
+        return pyarrow.schema([("pagina", pyarrow.string()), ("docx", pyarrow.string())]
+                              + [(c, tipos[t]) for c, t in TABELAS_RESULTADO[tabela]])
+
+    def adicionar(self, pagina, docx, registros):
+        for tabela, linhas in registros.items():
+            if not linhas:
+                continue
+            colunas = [c for c, _ in TABELAS_RESULTADO[tabela]]
+            if self.parquet:
+                import pyarrow.parquet
+
+                if tabela not in self._escritores:
+                    self._escritores[tabela] = pyarrow.parquet.ParquetWriter(
+                        os.path.join(self.caminho, f"{tabela}.parquet"), self._esquema(tabela))
+                colunas_arrow = {"pagina": [pagina] * len(linhas), "docx": [docx] * len(linhas)}
+                colunas_arrow.update((c, [l[n] for l in linhas]) for n, c in enumerate(colunas))
+                self._escritores[tabela].write_table(
+                    pyarrow.Table.from_pydict(colunas_arrow, schema=self._esquema(tabela)))
+            else:
+                for linha in linhas:
+                    registro = {"tabela": tabela, "pagina": pagina, "docx": docx, **dict(zip(colunas, linha))}
+                    self._arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def fechar(self):
+        for escritor in self._escritores.values():
+            escritor.close()
+        if self._arquivo:
+            self._arquivo.close()
+
+
+def resumo_paginas(itens, contagens):
+    """
+    gerar_resumo agregado: uma linha por par comparado (contagens por status
+    e % Exact), de itens [{"Page URL", "DOCX", ...}] e {índice em itens:
+    {status: n}}. O índice do resultado é o do item, porque a mesma URL pode
+    aparecer no lote com DOCX diferentes.
+    """
+    df = pd.DataFrame.from_dict(contagens, orient="index").reindex(columns=STATUS_COMPARACAO, fill_value=0)
+    df = df.fillna(0).astype(int)
+    df["Total"] = df.sum(axis=1)
+    df["% Exact"] = (df["Exact"] / df["Total"].where(df["Total"] > 0) * 100).round(1).fillna(0)
+    paginas = pd.DataFrame(itens, columns=["Page URL", "DOCX"]).loc[df.index]
+    return pd.concat([paginas, df], axis=1)
+
+
+def resumo_geral(contagens):
+    """gerar_resumo sobre todas as linhas do lote, sem precisar das linhas."""
+    total = {s: sum(c.get(s, 0) for c in contagens.values()) for s in STATUS_COMPARACAO}
+    return gerar_resumo(pd.DataFrame({"Status": [s for s, n in total.items() for _ in range(n)]}))
+
+
+class PlanilhaConsolidada:
+    """
+    Uma planilha write-only para o lote todo: Resumo e Paginas (agregados,
+    escritos no fim) e as abas de sempre com a coluna Page URL na frente,
+    preenchidas à medida que os itens terminam.
+    """
+
+    ABAS = {"comparacao": "Comparacao", "elementos": "Elementos da Pagina", "imagens": "Imagens",
+            "metadados": "Metadados", "destaques": "Italic-Bold Check"}
+    CORES = {"comparacao": CORES_STATUS, "destaques": CORES_BOLD}
+
+    def __init__(self, caminho):
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+
+        self.caminho = caminho
+        self.wb = Workbook(write_only=True)
+        self.aba_resumo = self.wb.create_sheet("Resumo")
+        self.aba_paginas = self.wb.create_sheet("Paginas")
+        self.abas, self.linhas = {}, {}
+        for tabela, titulo in self.ABAS.items():
+            ws = self.wb.create_sheet(titulo)
+            colunas = ["Page URL"] + [c for c, _ in TABELAS_RESULTADO[tabela]]
+            for i in range(1, len(colunas) + 1):
+                ws.column_dimensions[get_column_letter(i)].width = 40 if i <= 2 else 25
+            ws.append(_linha_cabecalho(ws, colunas))
+            self.abas[tabela], self.linhas[tabela] = ws, 0
+
+    def adicionar(self, pagina, registros):
+        for tabela, linhas in registros.items():
+            for linha in linhas:
+                self.abas[tabela].append([pagina, *linha])
+            self.linhas[tabela] += len(linhas)
+
+    def fechar(self, contagens, itens):
+        from openpyxl.utils import get_column_letter
+
+        for tabela, cores in self.CORES.items():
+            colunas = ["Page URL"] + [c for c, _ in TABELAS_RESULTADO[tabela]]
+            _colorir_por_status(self.abas[tabela], colunas, self.linhas[tabela], cores)
+        for aba, df in ((self.aba_resumo, resumo_geral(contagens)),
+                        (self.aba_paginas, pd.DataFrame(itens).join(
+                            resumo_paginas(itens, contagens).drop(columns=["Page URL", "DOCX"])))):
+            for i in range(1, len(df.columns) + 1):
+                aba.column_dimensions[get_column_letter(i)].width = 40 if i <= 2 else 15
+            aba.append(_linha_cabecalho(aba, list(df.columns)))
+            for linha in df.itertuples(index=False, name=None):
+                aba.append([None if isinstance(v, float) and v != v else v for v in linha])
+        self.wb.save(self.caminho)
+
+
+class ConsolidadorLote:
+    """
+    Recebe os resultados de executar_lote (com consolidar=True), grava os
+    registros no dataset e/ou na planilha consolidada e guarda as contagens
+    por status de cada item (pela posição em self.itens) para o resumo
+    agregado.
+    """
+
+    def __init__(self, dataset=None, planilha=None):
+        self.dataset = DatasetResultados(dataset) if dataset else None
+        self.planilha = PlanilhaConsolidada(planilha) if planilha else None
+        self.contagens, self.itens = {}, []
+
+    def adicionar(self, resultado):
+        registros = resultado.pop("registros", None)
+        self.itens.append({"Page URL": resultado["url"], "DOCX": resultado["docx"],
+                           "Resultado": resultado["status"], "Erro": resultado["erro"],
+                           "Arquivo": resultado["arquivo"]})
+        if not registros:
+            return
+        status = Counter(linha[2] for linha in registros["comparacao"])
+        self.contagens[len(self.itens) - 1] = dict(status)
+        if self.dataset:
+            self.dataset.adicionar(resultado["url"], resultado["docx"], registros)
+        if self.planilha:
+            self.planilha.adicionar(resultado["url"], registros)
+
+    def fechar(self):
+        """Fecha os arquivos e retorna o resumo por página."""
+        if self.dataset:
+            self.dataset.fechar()
+        if self.planilha:
+            self.planilha.fechar(self.contagens, self.itens)
+        return resumo_paginas(self.itens, self.contagens)
+
+
+# ---------------------- PAREAMENTO AUTOMÁTICO ----------------------
+# Para entregas grandes: casa cada DOCX com a sua URL pelas linhas de
+# Title tag / Meta description do documento contra os metadados das páginas,
+# com uma única matriz de similaridade e atribuição ótima (húngaro).
+
+CAMPOS_DOCX = {
+    "Title Tag": ("title tag",),
+    "Meta Description": ("meta description",),
+    "Open Graph Title": ("og title", "open graph title"),
+    "Open Graph Description": ("og description", "open graph description"),
+}
+_RE_SEPARADORES_URL = re.compile(r"[/_\-.]+")
+
+
+def metadados_docx(paragrafos):
+    """
+    Valores das linhas "Title tag: ..." / "Meta description: ..." etc. do DOCX.
+    Se o rótulo vier sozinho na linha, o valor é o parágrafo seguinte.
+    """
+    metadados = {}
+    for n, paragrafo in enumerate(paragrafos):
+        limpo = normalizar(paragrafo)
+        for campo, prefixos in CAMPOS_DOCX.items():
+            if campo in metadados or not limpo.startswith(prefixos):
+                continue
+            valor = paragrafo.split(":", 1)[1].strip() if ":" in paragrafo else ""
+            if not valor:
+                valor = next((p.strip() for p in paragrafos[n + 1:n + 3] if p.strip()), "")
+            metadados[campo] = valor
+            break
+    return metadados
+
+
+def texto_pareamento_docx(paragrafos, reserva=5):
+    """Título e descrições do DOCX; sem essas linhas, os primeiros parágrafos."""
+    metadados = metadados_docx(paragrafos)
+    if any(metadados.values()):
+        return " ".join(v for v in metadados.values() if v)
+    return " ".join([p for p in paragrafos if p.strip()][:reserva])
+
+
+def texto_pareamento_pagina(url, metadados):
+    """Metadados da página mais as palavras do caminho da URL (o slug)."""
+    slug = _RE_SEPARADORES_URL.sub(" ", urlparse(url).path).strip()
+    return " ".join([v for v in metadados.values() if v] + [slug])
+
+
+def metadados_html(html):
+    """extrair_metadados lendo só <title> e <meta> (sem montar a árvore inteira)."""
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    return extrair_metadados(BeautifulSoup(html, PARSER_HTML, parse_only=SoupStrainer(["title", "meta"])))
+
+
+def ler_lista_urls(fonte):
+    """URLs de um .txt (uma por linha) ou de um sitemap XML (arquivo ou URL, inclusive sitemap index)."""
+    if fonte.startswith(("http://", "https://")):
+        conteudo = baixar_html_estatico(fonte)
+    else:
+        with open(fonte, encoding="utf-8-sig") as f:
+            conteudo = f.read()
+    if not conteudo.lstrip().startswith("<"):
+        return [l.strip() for l in conteudo.splitlines() if l.strip() and not l.lstrip().startswith("#")]
+    raiz = ET.fromstring(conteudo.lstrip())
+    locs = [el.text.strip() for el in raiz.iter() if el.tag.rsplit("}", 1)[-1] == "loc" and el.text]
+    if raiz.tag.rsplit("}", 1)[-1] == "sitemapindex":
+        return [url for sitemap in locs for url in ler_lista_urls(sitemap)]
+    return locs
+
+
+def _confianca(score, margem):
+    if score >= 0.5 and margem >= 0.15:
+        return "alta"
+    if score < 0.2 or margem < 0.05:
+        return "baixa"
+    return "media"
+
+
+NIVEIS_CONFIANCA = ["alta", "media", "baixa"]
+
+
+@instrumentado("parear_documentos", lambda df, docx_paths, urls, *a, **k: {
+    "documentos": len(docx_paths), "urls": len(urls), "pares": int((df["url"] != "").sum())})
+def parear_documentos(docx_paths, urls, htmls):
+    """
+    Casa DOCX e URLs (htmls: HTML de cada URL ou a exceção da renderização).
+    Uma matriz TF-IDF de n-gramas de caracteres (robusta a acentos, plurais
+    e slugs) e linear_sum_assignment maximizando a soma das similaridades.
+    Retorna um DataFrame com docx, url, score, margem (para o 2º melhor da
+    linha e da coluna), confianca e os títulos, na ordem dos DOCX.
+    """
+    from scipy.optimize import linear_sum_assignment
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    textos_docx = [texto_pareamento_docx(ler_docx(p).paragrafos) for p in docx_paths]
+    paginas = [(u, h) for u, h in zip(urls, htmls) if not isinstance(h, Exception)]
+    metadados = [metadados_html(h) for _, h in paginas]
+    textos_pag = [texto_pareamento_pagina(u, m) for (u, _), m in zip(paginas, metadados)]
+
+    linhas = [{"docx": p, "url": "", "score": 0.0, "margem": 0.0, "confianca": "sem par",
+               "titulo_docx": t[:80], "titulo_pagina": ""} for p, t in zip(docx_paths, textos_docx)]
+    if not paginas or not docx_paths:
+        return pd.DataFrame(linhas)
+    vetorizador = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True, lowercase=True)
+    try:
+        matriz = vetorizador.fit_transform(textos_docx + textos_pag)
+    except ValueError:
+        return pd.DataFrame(linhas)
+    sims = (matriz[:len(textos_docx)] @ matriz[len(textos_docx):].T).toarray()
+
+    def segundo(valores, excluir):
+        resto = np.delete(valores, excluir)
+        return resto.max() if resto.size else 0.0
+
+    for i, j in zip(*linear_sum_assignment(sims, maximize=True)):
+        score = float(sims[i, j])
+        margem = float(min(score - segundo(sims[i], j), score - segundo(sims[:, j], i)))
+        linhas[i].update(url=paginas[j][0], score=round(score, 3), margem=round(margem, 3),
+                         confianca=_confianca(score, margem), titulo_pagina=metadados[j]["Title Tag"][:80])
+    return pd.DataFrame(linhas)
+
+
+def escrever_manifesto(caminho, pares, minimo="media"):
+    """
+    Grava no formato de ler_manifesto os pares com confiança até o nível
+    minimo. Os DOCX vão com caminho absoluto: ler_manifesto resolve os
+    relativos a partir da pasta do manifesto, não do diretório atual.
+    """
+    aceitos = pares[pares["confianca"].isin(NIVEIS_CONFIANCA[:NIVEIS_CONFIANCA.index(minimo) + 1])]
+    colunas = ["docx", "url", "output", "score", "margem", "confianca"]
+    absolutos = aceitos["docx"].map(lambda p: str(Path(p).resolve()))
+    aceitos.assign(docx=absolutos, output="")[colunas].to_csv(caminho, index=False, encoding="utf-8")
+    return aceitos
+
+# ---------------------- INTERFACE ----------------------
+# A janela só enfileira trabalhos: um thread de fundo roda o pipeline e
+# devolve eventos (etapa, fim, erro) numa fila que a janela lê com
+# root.after, sem travar o Tk. Erros ficam na lista, não em messagebox.
+
+class Cancelado(Exception):
+    """Trabalho cancelado pelo usuário (o pipeline para na próxima etapa)."""
+
+
+class RastreadorProgresso(Rastreador):
+    """Publica o início de cada etapa na fila de eventos e respeita o cancelamento."""
+
+    def __init__(self, trabalho, eventos):
+        super().__init__(trabalho["url"])
+        self.trabalho = trabalho
+        self.eventos = eventos
+
+    def iniciou(self, nome):
+        if self.trabalho["cancelado"].is_set():
+            raise Cancelado()
+        self.eventos.put((self.trabalho["id"], "etapa", nome, None))
+
+
+class TrabalhadorFundo:
+    """
+    Thread que roda os trabalhos (pares DOCX/URL) um por vez. Eventos em
+    self.eventos: (id, tipo, texto, segundos), tipo em inicio/etapa/ok/erro/cancelado.
+    """
+
+    def __init__(self):
+        self.trabalhos = queue.Queue()
+        self.eventos = queue.Queue()
+        self._registro = {}
+        self._ids = 0
+        self._thread = threading.Thread(target=self._rodar, daemon=True)
+        self._thread.start()
+
+    def enviar(self, docx_path, url, pasta):
+        self._ids += 1
+        trabalho = {"id": str(self._ids), "docx": docx_path, "url": url, "pasta": pasta,
+                    "cancelado": threading.Event()}
+        self._registro[trabalho["id"]] = trabalho
+        self.trabalhos.put(trabalho)
+        return trabalho["id"]
+
+    def cancelar(self, id_trabalho):
+        trabalho = self._registro.get(id_trabalho)
+        if trabalho:
+            trabalho["cancelado"].set()
+
+    def parar(self):
+        for id_trabalho in list(self._registro):
+            self.cancelar(id_trabalho)
+        self.trabalhos.put(None)
+
+    def _rodar(self):
+        while True:
+            trabalho = self.trabalhos.get()
+            if trabalho is None:
+                return
+            try:
+                self._executar(trabalho)
+            finally:
+                # Cancelado antes de começar ou não, o trabalho sai do registro
+                self._registro.pop(trabalho["id"], None)
+
+    def _executar(self, trabalho):
+        id_trabalho = trabalho["id"]
+        if trabalho["cancelado"].is_set():
+            self.eventos.put((id_trabalho, "cancelado", "", None))
+            return
+        self.eventos.put((id_trabalho, "inicio", "", None))
+        inicio = time.perf_counter()
+        try:
+            with RastreadorProgresso(trabalho, self.eventos):
+                destino = processar_par(trabalho["docx"], trabalho["url"], trabalho["pasta"])
+            evento = ("ok", destino)
+        except Cancelado:
+            evento = ("cancelado", "")
+        except Exception as e:
+            evento = ("erro", f"{type(e).__name__}: {e}")
+        self.eventos.put((id_trabalho, *evento, round(time.perf_counter() - inicio, 1)))
+
+
+class JanelaComparador:
+    """Janela única: botões para enfileirar pares, lista de trabalhos e progresso geral."""
+
+    COLUNAS = {"docx": ("DOCX", 180), "url": ("URL", 260), "status": ("Status", 90),
+               "etapa": ("Etapa", 150), "tempo": ("Tempo (s)", 70), "resultado": ("Resultado", 320)}
+    ROTULOS = {"inicio": "Executando", "ok": "OK", "erro": "Erro", "cancelado": "Cancelado"}
+    FINAIS = {"ok", "erro", "cancelado"}
+
+    def __init__(self, root):
+        self.root = root
+        self.trabalhador = TrabalhadorFundo()
+        self.pasta = ""
+        self.total = self.concluidos = 0
+
+        tk.Label(root, text="Escolha o modo de comparação:", font=("Arial", 12)).pack(pady=10)
+        botoes = tk.Frame(root)
+        botoes.pack(pady=5)
+        tk.Button(botoes, text="Single Page", width=18, command=lambda: comparar_um(self)).pack(side="left", padx=4)
+        tk.Button(botoes, text="Multiple Pages", width=18, command=lambda: comparar_varios(self)).pack(side="left", padx=4)
+        tk.Button(botoes, text="Manifesto...", width=18, command=self.abrir_manifesto).pack(side="left", padx=4)
+
+        self.lista = ttk.Treeview(root, columns=list(self.COLUNAS), show="headings", height=12)
+        for coluna, (titulo, largura) in self.COLUNAS.items():
+            self.lista.heading(coluna, text=titulo)
+            self.lista.column(coluna, width=largura, anchor="w")
+        self.lista.pack(fill="both", expand=True, padx=10, pady=5)
+
+        acoes = tk.Frame(root)
+        acoes.pack(pady=5)
+        tk.Button(acoes, text="Cancelar selecionados", command=self.cancelar_selecionados).pack(side="left", padx=4)
+        tk.Button(acoes, text="Cancelar todos", command=self.cancelar_todos).pack(side="left", padx=4)
+        tk.Button(acoes, text="Limpar concluídos", command=self.limpar_concluidos).pack(side="left", padx=4)
+
+        self.progresso = ttk.Progressbar(root, length=600, mode="determinate")
+        self.progresso.pack(pady=5)
+        self.situacao = tk.Label(root, text="Nenhum trabalho na fila")
+        self.situacao.pack(pady=(0, 10))
+
+        root.protocol("WM_DELETE_WINDOW", self.fechar)
+        root.after(100, self._ler_eventos)
+
+    def escolher_pasta(self):
+        """Pasta de saída, perguntada uma vez por sessão."""
+        if not self.pasta:
+            self.pasta = filedialog.askdirectory(title="Selecione a pasta de saída")
+        return self.pasta
+
+    def adicionar(self, docx_path, url):
+        id_trabalho = self.trabalhador.enviar(docx_path, url, self.pasta)
+        self.lista.insert("", "end", iid=id_trabalho, values=(Path(docx_path).name, url, "Na fila", "", "", ""))
+        self.total += 1
+        self._atualizar_progresso()
+
+    def abrir_manifesto(self):
+        caminho = filedialog.askopenfilename(
+            title="Selecione o manifesto", filetypes=[("Manifesto", "*.csv *.jsonl *.json")]
         )
-        messagebox.showinfo("Sucesso", "Comparação finalizada com sucesso!")
-    except Exception as e:
-        messagebox.showerror("Erro", str(e))
-
-
-def comparar_varios(root):
-    qtd = simpledialog.askinteger("Quantidade", "Quantos pares deseja comparar?")
-    if not qtd or qtd <= 0:
-        return
-    pasta = filedialog.askdirectory(title="Selecione a pasta de saída")
-    if not pasta:
-        return
-
-    progress_window = Tk()
-    progress_window.title("Progresso de Comparação")
-    progress_window.geometry("400x100")
-
-    Label(progress_window, text=f"Comparando {qtd} pares...", font=("Arial", 10)).pack(pady=10)
-    progress = ttk.Progressbar(progress_window, length=350, mode="determinate", maximum=qtd)
-    progress.pack(pady=5)
-
-    for i in range(qtd):
-        docx_path = filedialog.askopenfilename(
-            title=f"Arquivo DOCX {i+1}", filetypes=[("Word", "*.docx")]
-        )
-        if not docx_path:
-            continue
-        url = simpledialog.askstring("URL", f"URL para o arquivo {i+1}:")
-        if not url:
-            continue
-
-        try:
-            docx_txt = carregar_texto_docx(docx_path)
-            html_txt, main, meta, alts, titulo, imagens = carregar_texto_url(url)
-            df1 = comparar_textos(docx_txt, html_txt, meta, alts)
-            df1 = df1[df1["Document Text"].str.strip() != ""]
-            df2 = gerar_resumo(df1)
-            df3 = coletar_elementos_html(main)
-            df4 = pd.DataFrame(imagens, columns=["Image URL", "Image Alt"])
-            nome = re.sub(r'[\\/:*?"<>|]', '', titulo)[:50]
-            salvar_em_excel(
-                df1,
-                df2,
-                df3,
-                df4,
-                meta,
-                url,
-                os.path.join(pasta, f"comparacao_{nome}.xlsx"),
-                word_path=docx_path,
-            )
-            progress.step(1)
-            progress_window.update_idletasks()
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro em {docx_path}: {e}")
-
-    messagebox.showinfo("Sucesso", "Processo de múltiplas páginas finalizado com sucesso!")
-    progress_window.destroy()
-
-if __name__ == "__main__":
-    executar_comparador()
+        if not caminho or not self.escolher_pasta():
+            return
+        try:
+            itens = ler_manifesto(caminho)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Manifesto inválido: {e}")
+            return
+        for item in itens:
+            self.adicionar(item["docx"], item["url"])
+
+    def cancelar_selecionados(self):
+        for id_trabalho in self.lista.selection():
+            self.trabalhador.cancelar(id_trabalho)
+
+    def cancelar_todos(self):
+        for id_trabalho in self.lista.get_children():
+            self.trabalhador.cancelar(id_trabalho)
+
+    def limpar_concluidos(self):
+        for id_trabalho in self.lista.get_children():
+            if self.lista.set(id_trabalho, "status") in ("OK", "Erro", "Cancelado"):
+                self.lista.delete(id_trabalho)
+
+    def _ler_eventos(self):
+        try:
+            while True:
+                id_trabalho, tipo, texto, segundos = self.trabalhador.eventos.get_nowait()
+                if not self.lista.exists(id_trabalho):
+                    continue
+                if tipo == "etapa":
+                    self.lista.set(id_trabalho, "etapa", texto)
+                    continue
+                self.lista.set(id_trabalho, "status", self.ROTULOS[tipo])
+                if tipo in self.FINAIS:
+                    self.concluidos += 1
+                    self.lista.set(id_trabalho, "etapa", "")
+                    self.lista.set(id_trabalho, "tempo", "" if segundos is None else segundos)
+                    self.lista.set(id_trabalho, "resultado", texto)
+                    self._atualizar_progresso()
+        except queue.Empty:
+            pass
+        self.root.after(100, self._ler_eventos)
+
+    def _atualizar_progresso(self):
+        self.progresso.configure(maximum=max(self.total, 1), value=self.concluidos)
+        self.situacao.configure(text=f"{self.concluidos} de {self.total} concluídos")
+
+    def fechar(self):
+        self.trabalhador.parar()
+        self.root.destroy()
+
+
+def executar_comparador():
+    """Abre a interface; sem tkinter ou sem display, avisa e sugere o modo lote."""
+    try:
+        root = tk.Tk()
+    except Exception as e:  # sem tkinter (ImportError) ou sem display (TclError)
+        print(f"Interface gráfica indisponível ({e}). Use: python qatool.py lote MANIFESTO -o PASTA",
+              file=sys.stderr)
+        return 1
+    root.title("Comparador de Documentos")
+    root.geometry("1100x480")
+    JanelaComparador(root)
+    root.mainloop()
+    return 0
+
+
+def comparar_um(janela):
+    docx_path = filedialog.askopenfilename(
+        title="Selecione o arquivo .docx", filetypes=[("Word", "*.docx")]
+    )
+    if not docx_path:
+        return
+    url = simpledialog.askstring("URL", "Insira a URL correspondente:")
+    if not url:
+        return
+    if not janela.escolher_pasta():
+        return
+    janela.adicionar(docx_path, url)
+
+
+def comparar_varios(janela):
+    # Vários DOCX de uma vez; a URL de cada um é pedida em seguida
+    docx_paths = filedialog.askopenfilenames(
+        title="Selecione os arquivos .docx", filetypes=[("Word", "*.docx")]
+    )
+    if not docx_paths or not janela.escolher_pasta():
+        return
+    for i, docx_path in enumerate(docx_paths, start=1):
+        url = simpledialog.askstring("URL", f"URL para {Path(docx_path).name} ({i}/{len(docx_paths)}):")
+        if url:
+            janela.adicionar(docx_path, url)
+
+
+# ---------------------- SERVIÇO LOCAL ----------------------
+# `python qatool.py servir` mantém o navegador aberto, os processos com as
+# bibliotecas já importadas e os caches vivos entre pedidos: cada comparação
+# paga só a renderização e o matching. API HTTP/JSON em localhost:
+#
+#   POST /comparar          {"docx", "url", "output"?, "xlsx"?, "linhas"?, "esperar"?}
+#   GET  /trabalhos[/<id>]  estado e resultado dos trabalhos
+#   GET  /saude             fila, trabalhos em execução e concluídos
+
+PORTA_SERVICO = 8765
+HISTORICO_SERVICO = 1000
+HOSTS_LOCAIS = ("localhost", "127.0.0.1", "::1")
+MODULOS_PIPELINE = ("numpy", "pandas", "scipy.sparse", "sklearn.feature_extraction.text", "bs4", "openpyxl")
+
+
+class FilaCheia(RuntimeError):
+    """O serviço já tem max_fila trabalhos esperando ou em execução."""
+
+
+def _aquecer_processo():
+    """Importa as bibliotecas do pipeline num processo do pool."""
+    for nome in MODULOS_PIPELINE:
+        importlib.import_module(nome)
+    return os.getpid()
+
+
+class ServicoComparacao:
+    """
+    Fila de comparações com navegador e processos sempre prontos:
+
+        servico = ServicoComparacao("saida", perfil="rapido").iniciar()
+        trabalho = servico.enviar({"docx": "a.docx", "url": "https://..."})
+        servico.esperar(trabalho["id"])
+        servico.fechar()
+
+    limite é quantos trabalhos rodam ao mesmo tempo (os outros esperam na
+    fila, até max_fila); workers, concorrencia, perfil, cache, aproximado,
+    modelos e armazem são os mesmos de executar_lote.
+    """
+
+    ESPERANDO = ("na fila", "executando")
+
+    def __init__(self, pasta, workers=None, concorrencia=4, perfil="completo", cache=None, limite=None,
+                 max_fila=100, aproximado=False, modelos=None, armazem=None):
+        self.pasta = pasta
+        self.workers = workers or os.cpu_count() or 1
+        self.limite = limite or self.workers
+        self.max_fila = max_fila
+        self.modelos = modelos
+        self.opcoes = {"aproximado": aproximado, "armazem": armazem}
+        self.nav = PoolNavegador(concorrencia, perfil=perfil, cache=cache)
+        self.trabalhos, self._futuros = {}, {}
+        self._trava = threading.Lock()
+        self._ids = 0
+        self._loop = self._pool = self._vagas = None
+
+    def iniciar(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._iniciar(), self._loop).result()
+        return self
+
+    async def _iniciar(self):
+        loop = asyncio.get_running_loop()
+        self._vagas = asyncio.Semaphore(self.limite)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        await self.nav.iniciar()
+        await asyncio.gather(self.nav.aquecer(),
+                             *(loop.run_in_executor(self._pool, _aquecer_processo) for _ in range(self.workers)))
+
+    def fechar(self):
+        asyncio.run_coroutine_threadsafe(self._fechar(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _fechar(self):
+        await self.nav.fechar()
+        await asyncio.to_thread(self._pool.shutdown, cancel_futures=True)
+
+    def enviar(self, pedido):
+        """Enfileira um pedido e retorna o trabalho (ValueError se inválido, FilaCheia se lotado)."""
+        if not isinstance(pedido, dict) or not pedido.get("docx") or not pedido.get("url"):
+            raise ValueError("o pedido precisa de docx e url")
+        docx_path = Path(pedido["docx"]).resolve()
+        if not docx_path.is_file():
+            raise ValueError(f"DOCX não encontrado: {docx_path}")
+        saida = str(pedido.get("output") or "")
+        # O .xlsx fica sempre dentro da pasta do serviço
+        if saida in (".", "..") or any(sep in saida for sep in ("/", "\\", "\0")):
+            raise ValueError("output deve ser só o nome do arquivo, sem pastas")
+        with self._trava:
+            if sum(t["status"] in self.ESPERANDO for t in self.trabalhos.values()) >= self.max_fila:
+                raise FilaCheia(f"{self.max_fila} trabalhos já na fila")
+            self._ids += 1
+            trabalho = {"id": str(self._ids), "docx": str(docx_path), "url": str(pedido["url"]),
+                        "output": saida, "status": "na fila", "arquivo": "",
+                        "erro": "", "resumo": None, "render": None, "duracao": None}
+            self.trabalhos[trabalho["id"]] = trabalho
+            self._futuros[trabalho["id"]] = asyncio.run_coroutine_threadsafe(
+                self._rodar(trabalho, bool(pedido.get("xlsx", True)), bool(pedido.get("linhas"))), self._loop)
+            self._esquecer_antigos()
+            return dict(trabalho)
+
+    def _esquecer_antigos(self):
+        # Só os HISTORICO_SERVICO trabalhos mais recentes ficam consultáveis
+        for id_trabalho in list(self.trabalhos)[:max(0, len(self.trabalhos) - HISTORICO_SERVICO)]:
+            if self.trabalhos[id_trabalho]["status"] not in self.ESPERANDO:
+                del self.trabalhos[id_trabalho], self._futuros[id_trabalho]
+
+    def esperar(self, id_trabalho, timeout=None):
+        try:
+            self._futuros[id_trabalho].result(timeout)
+        except CancelledError:
+            pass  # serviço fechando: o trabalho já foi marcado como erro em _rodar
+        return self.consultar(id_trabalho)
+
+    def consultar(self, id_trabalho):
+        with self._trava:
+            trabalho = self.trabalhos.get(id_trabalho)
+            return dict(trabalho) if trabalho else None
+
+    def listar(self):
+        with self._trava:
+            return [{k: v for k, v in t.items() if k != "registros"} for t in self.trabalhos.values()]
+
+    def estado(self):
+        with self._trava:
+            status = Counter(t["status"] for t in self.trabalhos.values())
+        return {"perfil": self.nav.perfil, "workers": self.workers, "limite": self.limite,
+                "navegador": self.nav._browser is not None, "na fila": status["na fila"],
+                "executando": status["executando"], "concluidos": sum(status.values()) - status["na fila"]
+                - status["executando"]}
+
+    async def _rodar(self, trabalho, xlsx, linhas):
+        item = {"docx": trabalho["docx"], "url": trabalho["url"], "output": trabalho["output"]}
+        inicio = time.perf_counter()
+        resultado = None
+        try:
+            async with self._vagas:
+                trabalho["status"] = "executando"
+                inicio = time.perf_counter()
+                resultado = await self._comparar(trabalho, item, xlsx)
+        except Exception as e:
+            resultado = _executar_item(item, self.pasta, e)
+        finally:
+            # Seja qual for a falha, o trabalho sai de "executando" e esperar() retorna
+            if resultado is None:
+                resultado = _executar_item(item, self.pasta, RuntimeError("trabalho interrompido"))
+            registros = resultado.get("registros")
+            with self._trava:
+                trabalho.update(status=resultado["status"], arquivo=resultado["arquivo"], erro=resultado["erro"],
+                                duracao=round(time.perf_counter() - inicio, 2))
+                if registros:
+                    trabalho["resumo"] = dict(Counter(linha[2] for linha in registros["comparacao"]))
+                    if linhas:
+                        trabalho["registros"] = registros
+
+    async def _comparar(self, trabalho, item, xlsx):
+        try:
+            html, marcas = await self.nav.renderizar_com_tempos(item["url"])
+            trabalho["render"] = round(marcas["total"], 2)
+        except Exception as e:
+            html = e
+        modelo = self.modelos.get(dominio_da_url(item["url"])) if self.modelos else None
+        executar = partial(_executar_item, item, self.pasta, html, None, modelo,
+                           consolidar=True, gravar_xlsx=xlsx, **self.opcoes)
+        if isinstance(html, Exception):
+            return executar()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, executar)
+        except BrokenProcessPool as e:
+            # Um processo morreu: o trabalho falha, o pool é refeito para os próximos
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return _executar_item(item, self.pasta, e)
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=PORTA_SERVICO):
+    """ThreadingHTTPServer com a API JSON do serviço (ver o topo desta seção)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def _responder(self, codigo, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            caminho = urlparse(self.path).path.rstrip("/")
+            if caminho == "/saude":
+                self._responder(200, servico.estado())
+            elif caminho == "/trabalhos":
+                self._responder(200, servico.listar())
+            elif caminho.startswith("/trabalhos/"):
+                trabalho = servico.consultar(caminho.rsplit("/", 1)[1])
+                self._responder(200 if trabalho else 404, trabalho or {"erro": "trabalho não encontrado"})
+            else:
+                self._responder(404, {"erro": "caminho desconhecido"})
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip("/") != "/comparar":
+                self._responder(404, {"erro": "caminho desconhecido"})
+                return
+            # Só pedidos JSON de páginas locais (um site qualquer aberto no
+            # navegador não consegue mandar application/json sem preflight)
+            origem = self.headers.get("Origin")
+            if origem is not None and urlparse(origem).hostname not in HOSTS_LOCAIS:
+                self._responder(403, {"erro": "origem não permitida"})
+                return
+            if self.headers.get_content_type() != "application/json":
+                self._responder(415, {"erro": "Content-Type deve ser application/json"})
+                return
+            try:
+                pedido = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                trabalho = servico.enviar(pedido)
+            except FilaCheia as e:
+                self._responder(503, {"erro": str(e)})
+                return
+            except ValueError as e:
+                self._responder(400, {"erro": str(e)})
+                return
+            if pedido.get("esperar", True):
+                self._responder(200, servico.esperar(trabalho["id"]))
+            else:
+                self._responder(202, trabalho)
+
+    return ThreadingHTTPServer((host, porta), Manipulador)
+
+
+# ---------------------- LINHA DE COMANDO ----------------------
+
+def ler_manifesto(caminho):
+    """
+    Lê um manifesto CSV ou JSONL com as colunas docx, url e (opcional) output.
+    Caminhos relativos de DOCX são resolvidos a partir da pasta do manifesto.
+    """
+    base = Path(caminho).resolve().parent
+    with open(caminho, encoding="utf-8-sig", newline="") as f:
+        if str(caminho).lower().endswith((".jsonl", ".json")):
+            linhas = [json.loads(l) for l in f if l.strip()]
+        else:
+            linhas = list(csv.DictReader(f))
+
+    itens = []
+    for n, linha in enumerate(linhas, start=1):
+        linha = {str(k).strip().lower(): str(v if v is not None else "").strip() for k, v in linha.items() if k}
+        if not linha.get("docx") or not linha.get("url"):
+            raise ValueError(f"Linha {n} do manifesto sem docx ou url: {linha}")
+        docx_path = Path(linha["docx"])
+        if not docx_path.is_absolute():
+            docx_path = base / docx_path
+        itens.append({"docx": str(docx_path), "url": linha["url"], "output": linha.get("output", "")})
+
+    # Saídas repetidas no manifesto se sobrescreveriam: a partir da 2ª ganham sufixo
+    vistos = Counter()
+    for item in itens:
+        nome = item["output"].lower().removesuffix(".xlsx")
+        if nome:
+            vistos[nome] += 1
+            if vistos[nome] > 1:
+                item["output"] = f"{item['output'].removesuffix('.xlsx')}_{vistos[nome]}"
+    return itens
+
+
+def _executar_item(item, pasta, html=None, rastreio=None, modelo=None, extraido=None, aproximado=False,
+                   armazem=None, consolidar=False, gravar_xlsx=True, links=None):
+    """
+    Roda um item do lote sem deixar a exceção escapar (usado nos processos).
+    Com rastreio (kwargs do Rastreador), o resultado traz o rastro em "trace";
+    com consolidar, traz as linhas de todas as abas em "registros"; links
+    são os resultados do VerificadorLinks para a página.
+    """
+    inicio = time.perf_counter()
+    resultado = dict(item, status="ok", arquivo="", erro="")
+    rastreador = Rastreador(item.get("output") or item["url"], **rastreio) if rastreio is not None else None
+    with rastreador or nullcontext():
+        try:
+            if isinstance(html, Exception):
+                raise html
+            docx, pagina = extraido or extrair_par(item["docx"], item["url"], html=html, modelo=modelo)
+            res = comparar_par(docx, pagina, item["docx"], item["url"], aproximado, modelo, armazem, links)
+            if gravar_xlsx:
+                resultado["arquivo"] = salvar_resultado(res, item["url"], pasta, item.get("output") or None)
+            if consolidar:
+                resultado["registros"] = registros_do_resultado(res)
+        except Exception as e:
+            resultado["status"] = "erro"
+            resultado["erro"] = f"{type(e).__name__}: {e}"
+    if rastreador:
+        resultado["trace"] = rastreador.como_dict()
+    resultado["duracao"] = round(time.perf_counter() - inicio, 2)
+    return resultado
+
+
+def _extrair_item(item, html, rastreio=None, modelo=None):
+    """
+    Primeira fase do lote com ModeloSite: só lê o DOCX e extrai a página (com
+    os padroes e links_fixos do modelo salvo do site, se houver).
+    Retorna {"extraido": (ConteudoDocx, PaginaExtraida) ou a exceção, "trace", "duracao"}.
+    """
+    inicio = time.perf_counter()
+    rastreador = Rastreador(item.get("output") or item["url"], **rastreio) if rastreio is not None else None
+    with rastreador or nullcontext():
+        try:
+            if isinstance(html, Exception):
+                raise html
+            extraido = extrair_par(item["docx"], item["url"], html=html, modelo=modelo)
+        except Exception as e:
+            extraido = e
+    return {"extraido": extraido, "trace": rastreador.como_dict() if rastreador else None,
+            "duracao": time.perf_counter() - inicio}
+
+
+# Registros que passam entre os estágios do lote: tuplas compactas, sem
+# árvore do DOM (o HTML só vive entre a renderização e a extração)
+PaginaRenderizada = namedtuple("PaginaRenderizada", ["n", "item", "html", "marcas", "render"])
+PaginaNoLote = namedtuple(
+    "PaginaNoLote", ["n", "item", "extraido", "rastro", "duracao", "marcas", "render", "links", "etapas"]
+)
+
+
+async def _alimentar(fila, registros):
+    for registro in registros:
+        await fila.put(registro)
+    await fila.put(None)
+
+
+async def _estagio(entrada, saida, funcao, paralelos):
+    """
+    paralelos tarefas lendo registros de entrada, aplicando funcao (async) e
+    pondo o resultado em saida (se houver). None na entrada encerra o estágio
+    e é repassado adiante.
+    """
+    async def tarefa():
+        while (registro := await entrada.get()) is not None:
+            resultado = await funcao(registro)
+            if saida is not None:
+                await saida.put(resultado)
+        await entrada.put(None)  # para as outras tarefas do estágio
+
+    await asyncio.gather(*(tarefa() for _ in range(paralelos)))
+    if saida is not None:
+        await saida.put(None)
+
+
+async def _encadear(registros, estagios, tamanho_fila):
+    """
+    Liga os estágios [(funcao, paralelos), ...] por filas de até tamanho_fila
+    registros: um estágio espera quando a fila seguinte está cheia, então o
+    número de páginas em memória não depende do tamanho do lote.
+    """
+    filas = [asyncio.Queue(maxsize=tamanho_fila) for _ in estagios]
+    tarefas = [asyncio.ensure_future(_alimentar(filas[0], registros))]
+    for k, (funcao, paralelos) in enumerate(estagios):
+        saida = filas[k + 1] if k + 1 < len(filas) else None
+        tarefas.append(asyncio.ensure_future(_estagio(filas[k], saida, funcao, paralelos)))
+    try:
+        await asyncio.gather(*tarefas)
+    except BaseException:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        raise
+
+
+async def _executar_lote_async(itens, pasta, workers, concorrencia, perfil, cache, rastreio, modelos, opcoes,
+                               entregar, verificador=None):
+    """
+    Lote em estágios ligados por filas limitadas: renderização no
+    PoolNavegador → extração, matching e gravação no pool de processos (cada
+    processo com uma página por vez). Com verificador, a extração vira um
+    estágio próprio, seguido da verificação dos links, antes do matching. Com
+    modelos (dict de ModeloSite), o lote roda em duas fases: extrai todas as
+    páginas (só os registros compactos ficam guardados), monta o modelo de
+    cada site e só então faz o matching. opcoes vai para _executar_item;
+    entregar recebe cada resultado (numa thread: pode bloquear).
+    """
+    loop = asyncio.get_running_loop()
+    workers = workers or os.cpu_count() or 1
+    pendentes = set(range(len(itens)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            async with PoolNavegador(concorrencia, perfil=perfil, cache=cache) as nav:
+                def concluir(resultado, marcas, render, anteriores=None, extras=()):
+                    resultado["render"] = render
+                    if "trace" in resultado:
+                        # A renderização (e a 1ª fase) aconteceram fora do processo que rastreou o item
+                        resultado["trace"]["etapas"][:0] = [
+                            {"etapa": nome, "segundos": round(seg, 4), "perfil": perfil}
+                            for nome, seg in _etapas_render(marcas)
+                        ] + (anteriores["etapas"] if anteriores else []) + list(extras)
+                    return resultado
+
+                async def no_pool(funcao, *args, **kwargs):
+                    # Itens que já falharam (a exceção pode nem ser serializável) ficam neste processo
+                    if isinstance(args[2 if funcao is _executar_item else 1], Exception):
+                        return funcao(*args, **kwargs)
+                    return await loop.run_in_executor(pool, partial(funcao, *args, **kwargs))
+
+                async def entregar_um(n, resultado):
+                    pendentes.discard(n)
+                    await asyncio.to_thread(entregar, resultado)
+
+                async def renderizar(registro):
+                    n, item = registro
+                    try:
+                        html, marcas = await nav.renderizar_com_tempos(item["url"])
+                        return PaginaRenderizada(n, item, html, marcas, round(marcas["total"], 2))
+                    except Exception as e:
+                        return PaginaRenderizada(n, item, e, {}, None)
+
+                async def processar(p):
+                    resultado = await no_pool(_executar_item, p.item, pasta, p.html, rastreio, **opcoes)
+                    await entregar_um(p.n, concluir(resultado, p.marcas, p.render))
+
+                def modelo_de(p):
+                    return modelos.get(dominio_da_url(p.item["url"])) if modelos is not None else None
+
+                async def extrair(p):
+                    fase = await no_pool(_extrair_item, p.item, p.html, rastreio, modelo_de(p))
+                    return PaginaNoLote(p.n, p.item, fase["extraido"], fase["trace"], fase["duracao"],
+                                        p.marcas, p.render, None, ())
+
+                async def verificar(p):
+                    # Todas as páginas usam o mesmo VerificadorLinks: cada URL é conferida uma vez
+                    if isinstance(p.extraido, Exception):
+                        return p
+                    inicio = time.perf_counter()
+                    urls = links_da_pagina(p.item["url"], p.extraido[1], modelo_de(p))
+                    links = await asyncio.to_thread(verificador.verificar, urls)
+                    return p._replace(links=links, etapas=[{
+                        "etapa": "verificar_links", "segundos": round(time.perf_counter() - inicio, 4),
+                        "links": len(urls)}])
+
+                async def comparar(p):
+                    erro = p.extraido if isinstance(p.extraido, Exception) else None
+                    resultado = await no_pool(
+                        _executar_item, p.item, pasta, erro, rastreio, modelo_de(p),
+                        None if erro else p.extraido, links=p.links, **opcoes)
+                    resultado["duracao"] = round(resultado["duracao"] + p.duracao, 2)
+                    await entregar_um(p.n, concluir(resultado, p.marcas, p.render, p.rastro, p.etapas))
+
+                renderizacao = (renderizar, nav.concorrencia)
+                finais = ([(verificar, nav.concorrencia)] if verificador else []) + [(comparar, workers)]
+                if modelos is None and verificador is None:
+                    await _encadear(enumerate(itens), [renderizacao, (processar, workers)], workers)
+                elif modelos is None:
+                    await _encadear(enumerate(itens), [renderizacao, (extrair, workers)] + finais, workers)
+                else:
+                    extraidas = []
+
+                    async def guardar(p):
+                        extraidas.append(p)
+
+                    await _encadear(enumerate(itens), [renderizacao, (extrair, workers), (guardar, 1)], workers)
+                    montar_modelos([(p.item["url"], *p.extraido) for p in extraidas
+                                    if not isinstance(p.extraido, Exception)], modelos)
+                    await _encadear(extraidas, finais, workers)
+        except Exception as e:
+            # Falha do navegador ou do pool: os itens restantes saem com o erro
+            for n in sorted(pendentes):
+                entregar(_executar_item(itens[n], pasta, html=e, rastreio=rastreio))
+
+
+def executar_lote(itens, pasta, workers=None, concorrencia=4, perfil="completo", cache=None, rastreio=None,
+                  aproximado=False, modelos=None, armazem=None, consolidar=False, gravar_xlsx=True,
+                  verificador=None):
+    """
+    Processa os itens com um navegador compartilhado (concorrencia páginas por
+    vez) e um pool de processos; gera cada resultado assim que termina.
+    O campo "render" traz o tempo de renderização da página em segundos e,
+    com rastreio, "trace" traz o rastro das etapas (ver Rastreador).
+    Com modelos ({domínio: ModeloSite}, pode começar vazio ou vir de
+    carregar_modelos), o template de cada site sai do matching e o dict é
+    atualizado com as páginas do lote. Com armazem (ArmazemExecucoes), só as
+    linhas que mudaram desde a execução anterior são pontuadas. consolidar
+    põe as linhas de cada item em "registros" (ver ConsolidadorLote) e, sem
+    gravar_xlsx, nenhum .xlsx por item é gravado. Com verificador
+    (VerificadorLinks), links e imagens de todas as páginas são conferidos
+    uma vez cada e ganham status e latência nas abas. Os estágios são
+    ligados por filas limitadas: a memória não cresce com o tamanho do lote.
+    """
+    opcoes = {"aproximado": aproximado, "armazem": armazem, "consolidar": consolidar, "gravar_xlsx": gravar_xlsx}
+    os.makedirs(pasta, exist_ok=True)
+    # Limitada: se quem consome os resultados atrasa, o lote espera em vez de acumular
+    fila = queue.Queue(maxsize=2 * (workers or os.cpu_count() or 1))
+    thread = threading.Thread(
+        target=lambda: asyncio.run(_executar_lote_async(
+            itens, pasta, workers, concorrencia, perfil, cache, rastreio, modelos, opcoes, fila.put, verificador)),
+        daemon=True,
+    )
+    thread.start()
+    for _ in itens:
+        yield fila.get()
+    thread.join()
+
+
+def _cache_dos_args(args):
+    if not (args.cache or args.offline):
+        return None
+    return CacheHtml(args.cache_dir, ttl=args.ttl * 3600, tamanho_max=args.cache_max_mb * 2**20,
+                     atualizar=args.atualizar, offline=args.offline)
+
+
+def _argumentos_cache(parser):
+    grupo = parser.add_argument_group("cache de HTML renderizado")
+    grupo.add_argument("--cache", action="store_true", help="reaproveita páginas já renderizadas")
+    grupo.add_argument("--cache-dir", default=None, help=f"pasta do cache (padrão: {DIR_CACHE_PADRAO})")
+    grupo.add_argument("--ttl", type=float, default=24, help="validade das páginas salvas, em horas")
+    grupo.add_argument("--cache-max-mb", type=int, default=500, help="tamanho máximo do cache")
+    grupo.add_argument("--atualizar", action="store_true", help="renderiza de novo e atualiza o cache")
+    grupo.add_argument("--offline", action="store_true",
+                       help="usa só páginas do cache, sem navegador nem rede")
+
+
+def _rastreio_dos_args(args):
+    if not (args.trace or args.cprofile):
+        return None
+    pasta = args.trace or args.saida
+    return {"memoria": args.memoria, "perfilar": args.cprofile, "pasta_perfil": pasta}
+
+
+def _salvar_rastros(pasta, resultados):
+    """Um JSON por página e a tabela agregada por etapa (etapas.csv)."""
+    os.makedirs(pasta, exist_ok=True)
+    rastros = []
+    for n, res in enumerate(resultados, start=1):
+        if "trace" not in res:
+            continue
+        rastros.append(res["trace"])
+        nome = re.sub(r"[^\w.-]+", "_", res.get("output") or urlparse(res["url"]).path.strip("/") or "pagina")[:60]
+        with open(os.path.join(pasta, f"trace_{n:04d}_{nome}.json"), "w", encoding="utf-8") as f:
+            json.dump(res["trace"], f, ensure_ascii=False, indent=2)
+    tabela = agregar_rastros(rastros)
+    if not tabela.empty:
+        tabela.to_csv(os.path.join(pasta, "etapas.csv"))
+    return tabela
+
+
+def _cmd_lote(args):
+    itens = ler_manifesto(args.manifesto)
+    resultados = []
+    modelos = carregar_modelos(args.modelo) if args.site or args.modelo else None
+    consolidador = (ConsolidadorLote(args.dataset, args.consolidado)
+                    if args.dataset or args.consolidado else None)
+    verificador = None
+    if args.verificar_links:
+        arquivo = os.path.join(args.cache_dir or DIR_CACHE_PADRAO, "links.json") if args.cache else None
+        verificador = VerificadorLinks(args.links_concorrencia, args.links_ttl * 3600, arquivo=arquivo)
+    lote = executar_lote(itens, args.saida, args.workers, args.concorrencia, args.perfil,
+                         _cache_dos_args(args), _rastreio_dos_args(args), args.aproximado, modelos,
+                         ArmazemExecucoes(args.armazem) if args.armazem else None,
+                         consolidar=consolidador is not None, gravar_xlsx=not args.sem_xlsx,
+                         verificador=verificador)
+    for n, res in enumerate(lote, start=1):
+        if consolidador:
+            consolidador.adicionar(res)
+        resultados.append(res)
+        if res["status"] == "ok":
+            print(f"[{n}/{len(itens)}] OK    {res['url']} -> {res['arquivo'] or '(consolidado)'} "
+                  f"(render {res['render']}s, processamento {res['duracao']}s)")
+        else:
+            print(f"[{n}/{len(itens)}] ERRO  {res['url']} ({res['docx']}): {res['erro']}", file=sys.stderr)
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            for res in resultados:
+                f.write(json.dumps(res, ensure_ascii=False) + "\n")
+    if args.modelo:
+        salvar_modelos(args.modelo, modelos)
+    if verificador:
+        verificador.fechar()
+        quebrados = verificador.quebrados()
+        for url, status in sorted(quebrados.items()):
+            print(f"LINK  {status}  {url}", file=sys.stderr)
+        print(f"{len(verificador.pedidas)} links e imagens conferidos, {len(quebrados)} com erro")
+    if consolidador:
+        resumo = consolidador.fechar()
+        if not resumo.empty:
+            print(resumo.to_string(index=False))
+        print(resumo_geral(consolidador.contagens).to_string(index=False))
+    if args.trace:
+        tabela = _salvar_rastros(args.trace, resultados)
+        if not tabela.empty:
+            print(tabela.to_string())
+    falhas = sum(r["status"] != "ok" for r in resultados)
+    print(f"{len(resultados) - falhas} ok, {falhas} com erro")
+    return 1 if falhas else 0
+
+
+def _cmd_perfis(args):
+    tempos = []
+    for perfil in args.perfis:
+        for url, html in zip(args.urls, renderizar_urls(args.urls, args.concorrencia, perfil, tempos)):
+            if isinstance(html, Exception):
+                print(f"ERRO  {perfil:<9} {url}: {html}", file=sys.stderr)
+    df = pd.DataFrame(tempos)
+    if df.empty:
+        return 1
+    tabela = df.pivot_table(index="url", columns="perfil", values="total").round(2)
+    if "completo" in tabela:
+        for perfil in tabela.columns.drop("completo"):
+            tabela[f"economia {perfil}"] = (tabela["completo"] - tabela[perfil]).round(2)
+    print(tabela.to_string())
+    return 0
+
+
+def _cmd_parear(args):
+    docx_paths = sorted(str(p) for p in Path(args.pasta).glob("*.docx") if not p.name.startswith("~$"))
+    urls = list(dict.fromkeys(ler_lista_urls(args.urls)))
+    print(f"{len(docx_paths)} DOCX, {len(urls)} URLs; lendo metadados ({args.perfil})...")
+    htmls = renderizar_urls(urls, args.concorrencia, args.perfil, cache=_cache_dos_args(args))
+    for url, html in zip(urls, htmls):
+        if isinstance(html, Exception):
+            print(f"ERRO  {url}: {html}", file=sys.stderr)
+
+    pares = parear_documentos(docx_paths, urls, htmls)
+    with pd.option_context("display.max_colwidth", 50, "display.width", 200):
+        print(pares.assign(docx=pares["docx"].map(lambda p: Path(p).name)).to_string(index=False))
+    aceitos = escrever_manifesto(args.manifesto, pares, args.min_confianca)
+    sem_par = set(urls) - set(pares["url"])
+    print(f"{len(aceitos)} pares gravados em {args.manifesto}; "
+          f"{len(pares) - len(aceitos)} DOCX abaixo de '{args.min_confianca}' ou sem par; "
+          f"{len(sem_par)} URLs sem DOCX")
+    if not args.executar:
+        return 0
+    lote = ["lote", args.manifesto, "-o", args.executar, "-p", args.perfil, "-c", str(args.concorrencia)]
+    if args.cache or args.offline:
+        lote += ["--cache", "--ttl", str(args.ttl), "--cache-max-mb", str(args.cache_max_mb)]
+        lote += ["--cache-dir", args.cache_dir] if args.cache_dir else []
+        lote += ["--offline"] if args.offline else []
+        lote += ["--atualizar"] if args.atualizar else []
+    return main(lote)
+
+
+def _cmd_servir(args):
+    servico = ServicoComparacao(
+        args.saida, args.workers, args.concorrencia, args.perfil, _cache_dos_args(args), args.limite,
+        args.max_fila, args.aproximado, carregar_modelos(args.modelo) if args.modelo else None,
+        ArmazemExecucoes(args.armazem) if args.armazem else None,
+    )
+    print(f"Aquecendo navegador ({args.perfil}) e {servico.workers} processos...")
+    servico.iniciar()
+    servidor = criar_servidor(servico, args.host, args.porta)
+    print(f"Servindo em http://{args.host}:{servidor.server_address[1]} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.fechar()
+    return 0
+
+
+def _cmd_enviar(args):
+    pedido = {"docx": str(Path(args.docx).resolve()), "url": args.url, "output": args.output or ""}
+    requisicao = urllib.request.Request(
+        f"{args.servidor.rstrip('/')}/comparar", data=json.dumps(pedido).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(requisicao) as resposta:
+            trabalho = json.load(resposta)
+    except urllib.error.HTTPError as e:
+        print(f"ERRO  {json.load(e).get('erro', e)}", file=sys.stderr)
+        return 1
+    if trabalho["status"] != "ok":
+        print(f"ERRO  {trabalho['url']}: {trabalho['erro']}", file=sys.stderr)
+        return 1
+    print(f"OK    {trabalho['url']} -> {trabalho['arquivo'] or '(sem xlsx)'} "
+          f"(render {trabalho['render']}s, total {trabalho['duracao']}s)")
+    print("      " + ", ".join(f"{s}: {trabalho['resumo'].get(s, 0)}" for s in STATUS_COMPARACAO))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparador de Documentos (DOCX x página web)")
+    sub = parser.add_subparsers(dest="comando")
+
+    p_lote = sub.add_parser("lote", help="compara os pares de um manifesto CSV/JSONL sem interface gráfica")
+    p_lote.add_argument("manifesto", help="CSV ou JSONL com as colunas docx, url e output (opcional)")
+    p_lote.add_argument("-o", "--saida", default=".", help="pasta de saída dos .xlsx")
+    p_lote.add_argument("-w", "--workers", type=int, default=None,
+                        help="processos em paralelo (padrão: número de CPUs)")
+    p_lote.add_argument("-c", "--concorrencia", type=int, default=4,
+                        help="páginas renderizadas ao mesmo tempo no navegador compartilhado")
+    p_lote.add_argument("--relatorio", help="grava o resultado de cada item em JSONL")
+    p_lote.add_argument("-p", "--perfil", choices=sorted(PERFIS_RENDER), default="completo",
+                        help="perfil de renderização (rapido bloqueia recursos pesados)")
+    p_lote.add_argument("--aproximado", action="store_true",
+                        help="em páginas grandes, pontua só a lista curta de blocos de cada parágrafo")
+    p_lote.add_argument("--site", action="store_true",
+                        help="detecta o template de cada site no lote e o tira do matching (duas fases)")
+    p_lote.add_argument("--modelo", metavar="JSON",
+                        help="modelo de template salvo: lido se existir, atualizado ao fim (implica --site)")
+    p_lote.add_argument("--armazem", metavar="SQLITE",
+                        help="guarda as linhas pontuadas; reexecuções só pontuam o que mudou (aba Mudancas)")
+    grupo = p_lote.add_argument_group("saída consolidada")
+    grupo.add_argument("--dataset", metavar="ARQUIVO",
+                       help="todas as linhas do lote num .jsonl (ou pasta .parquet, precisa de pyarrow)")
+    grupo.add_argument("--consolidado", metavar="XLSX", help="uma planilha com o lote inteiro e o resumo por página")
+    grupo.add_argument("--sem-xlsx", action="store_true", help="não grava um .xlsx por par")
+    grupo = p_lote.add_argument_group("verificação de links")
+    grupo.add_argument("--verificar-links", action="store_true",
+                       help="confere links e imagens (status HTTP e latência nas abas Elementos e Imagens)")
+    grupo.add_argument("--links-concorrencia", type=int, default=16, help="requisições ao mesmo tempo")
+    grupo.add_argument("--links-ttl", type=float, default=24,
+                       help="validade dos resultados, em horas (guardados no cache com --cache)")
+    _argumentos_cache(p_lote)
+    grupo = p_lote.add_argument_group("instrumentação")
+    grupo.add_argument("--trace", metavar="PASTA",
+                       help="grava um rastro JSON por página e a tabela agregada etapas.csv")
+    grupo.add_argument("--memoria", action="store_true",
+                       help="mede o pico de memória Python por etapa (tracemalloc, mais lento)")
+    grupo.add_argument("--cprofile", metavar="ETAPA",
+                       help="roda a etapa (ex.: comparar_textos) sob cProfile e grava os .prof")
+    p_lote.set_defaults(func=_cmd_lote)
+
+    p_perfis = sub.add_parser("perfis", help="mede o tempo de renderização de URLs em cada perfil")
+    p_perfis.add_argument("urls", nargs="+")
+    p_perfis.add_argument("--perfis", nargs="+", choices=sorted(PERFIS_RENDER), default=list(PERFIS_RENDER))
+    p_perfis.add_argument("-c", "--concorrencia", type=int, default=1)
+    p_perfis.set_defaults(func=_cmd_perfis)
+
+    p_parear = sub.add_parser("parear", help="casa uma pasta de DOCX com uma lista de URLs e grava o manifesto")
+    p_parear.add_argument("pasta", help="pasta com os .docx")
+    p_parear.add_argument("urls", help="arquivo .txt (uma URL por linha) ou sitemap XML (arquivo ou URL)")
+    p_parear.add_argument("-m", "--manifesto", default="manifesto.csv", help="CSV de saída (entrada do lote)")
+    p_parear.add_argument("-p", "--perfil", choices=sorted(PERFIS_RENDER), default="estatico",
+                          help="perfil para ler os metadados (estatico basta quando vêm do servidor) "
+                               "e para renderizar no --executar")
+    p_parear.add_argument("-c", "--concorrencia", type=int, default=8)
+    p_parear.add_argument("--min-confianca", choices=NIVEIS_CONFIANCA, default="media",
+                          help="pares abaixo desse nível ficam fora do manifesto")
+    p_parear.add_argument("--executar", metavar="PASTA",
+                          help="depois de parear, roda o lote com o manifesto e grava os .xlsx na pasta")
+    _argumentos_cache(p_parear)
+    p_parear.set_defaults(func=_cmd_parear)
+
+    p_servir = sub.add_parser("servir", help="serviço local HTTP/JSON com navegador e processos sempre prontos")
+    p_servir.add_argument("-o", "--saida", default=".", help="pasta de saída dos .xlsx")
+    p_servir.add_argument("--host", default="127.0.0.1")
+    p_servir.add_argument("--porta", type=int, default=PORTA_SERVICO)
+    p_servir.add_argument("-w", "--workers", type=int, default=None,
+                          help="processos de matching (padrão: número de CPUs)")
+    p_servir.add_argument("-c", "--concorrencia", type=int, default=4,
+                          help="páginas renderizadas ao mesmo tempo no navegador")
+    p_servir.add_argument("--limite", type=int, default=None,
+                          help="trabalhos executando ao mesmo tempo (padrão: workers)")
+    p_servir.add_argument("--max-fila", type=int, default=100, help="pedidos além disso recebem 503")
+    p_servir.add_argument("-p", "--perfil", choices=sorted(PERFIS_RENDER), default="completo")
+    p_servir.add_argument("--aproximado", action="store_true",
+                          help="em páginas grandes, pontua só a lista curta de blocos de cada parágrafo")
+    p_servir.add_argument("--modelo", metavar="JSON", help="modelo de template salvo por um lote com --modelo")
+    p_servir.add_argument("--armazem", metavar="SQLITE",
+                          help="guarda as linhas pontuadas; pedidos repetidos só pontuam o que mudou")
+    _argumentos_cache(p_servir)
+    p_servir.set_defaults(func=_cmd_servir)
+
+    p_enviar = sub.add_parser("enviar", help="manda um par DOCX/URL para o serviço local e espera o resultado")
+    p_enviar.add_argument("docx")
+    p_enviar.add_argument("url")
+    p_enviar.add_argument("--output", help="nome do .xlsx (padrão: título da página)")
+    p_enviar.add_argument("--servidor", default=f"http://127.0.0.1:{PORTA_SERVICO}")
+    p_enviar.set_defaults(func=_cmd_enviar)
+
+    args = parser.parse_args(argv)
+    if not args.comando:
+        return executar_comparador()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+@pytest.fixture
+def servir():
+    """
+    Sobe servidores HTTP locais para o teste: servir(Manipulador) retorna a
+    URL base (http://127.0.0.1:porta); todos são fechados no fim.
+    """
+    servidores = []
+
+    def iniciar(manipulador):
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+        return f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,39 @@
+"""
+Orçamento de `import qatool`: a interface e a linha de comando precisam
+abrir rápido, então numpy, pandas, scipy, tkinter e playwright só podem ser
+carregados quando uma função precisar deles.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+LIMITE_SEGUNDOS = 0.5
+MODULOS_PESADOS = ("numpy", "pandas", "scipy", "tkinter", "playwright")
+
+_SONDA = """
+import json, sys, time
+inicio = time.perf_counter()
+import qatool
+segundos = time.perf_counter() - inicio
+print(json.dumps({"segundos": segundos, "pesados": sorted(m for m in %r if m in sys.modules)}))
+"""
+
+
+def _importar():
+    """Importa o qatool num interpretador novo; retorna o tempo e os módulos pesados carregados."""
+    saida = subprocess.run([sys.executable, "-c", _SONDA % (MODULOS_PESADOS,)],
+                           capture_output=True, text=True, check=True, cwd=RAIZ)
+    return json.loads(saida.stdout)
+
+
+def test_importacao_dentro_do_orcamento():
+    # Melhor de 3 para não falhar por ruído da máquina
+    melhor = min(_importar()["segundos"] for _ in range(3))
+    assert melhor < LIMITE_SEGUNDOS, f"import qatool levou {melhor:.3f}s (limite {LIMITE_SEGUNDOS}s)"
+
+
+def test_importacao_nao_carrega_modulos_pesados():
+    assert _importar()["pesados"] == []
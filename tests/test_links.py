@@ -0,0 +1,136 @@
+"""VerificadorLinks contra um servidor local com respostas conhecidas."""
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+import pytest
+
+import qatool
+
+# caminho -> (status do HEAD, status do GET, Location)
+ROTAS = {
+    "/ok": (200, 200, None),
+    "/so-get": (405, 200, None),
+    "/r1": (301, 301, "/r2"),
+    "/r2": (302, 302, "/ok"),
+    "/quebrado": (404, 404, None),
+    "/ciclo": (301, 301, "/ciclo"),
+    "/fr/bouledogue-français": (200, 200, None),
+    "/lento": (200, 200, None),
+}
+
+
+def _manipulador(pedidos):
+    class Manipulador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self):
+            caminho = unquote(self.path)
+            pedidos.append((self.command, caminho))
+            if caminho == "/lento":
+                time.sleep(0.2)
+            status_head, status_get, destino = ROTAS.get(caminho, (404, 404, None))
+            self.send_response(status_head if self.command == "HEAD" else status_get)
+            if destino:
+                self.send_header("Location", destino)
+            corpo = b"" if self.command == "HEAD" else b"ok"
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        do_HEAD = do_GET = _responder
+
+    return Manipulador
+
+
+@pytest.fixture
+def stub(servir):
+    pedidos = []
+    return servir(_manipulador(pedidos)), pedidos
+
+
+@pytest.fixture
+def verificador():
+    verificador = qatool.VerificadorLinks(concorrencia=4, ttl=3600, timeout=5)
+    yield verificador
+    verificador.fechar()
+
+
+def test_status_finais(stub, verificador):
+    base, _ = stub
+    urls = {nome: base + caminho for nome, caminho in [
+        ("ok", "/ok"), ("so_get", "/so-get"), ("redirecionado", "/r1"), ("quebrado", "/quebrado"),
+        ("ciclo", "/ciclo"), ("acentuado", "/fr/bouledogue-français")]}
+    urls["recusado"] = "http://127.0.0.1:1/x"
+    urls["host_invalido"] = "http://exemplo..com/x"
+
+    resultados = verificador.verificar(urls.values())
+    status = {nome: resultados[url]["status"] for nome, url in urls.items()}
+
+    assert status == {
+        "ok": 200,
+        "so_get": 200,          # HEAD recusado, GET responde
+        "redirecionado": 200,   # 301 -> 302 -> 200
+        "quebrado": 404,
+        "ciclo": 301,           # parou depois de MAX_REDIRECIONAMENTOS
+        "acentuado": 200,
+        "recusado": "ConnectionRefusedError",
+        "host_invalido": "UnicodeError",
+    }
+    assert all(r["latencia"] >= 0 for r in resultados.values())
+    assert verificador.quebrados() == {
+        urls["quebrado"]: 404, urls["recusado"]: "ConnectionRefusedError", urls["host_invalido"]: "UnicodeError"}
+
+
+def test_pedidos_feitos(stub, verificador):
+    base, pedidos = stub
+    verificador.verificar([base + "/ok", base + "/so-get", base + "/ok", base + "/r1", base + "/quebrado",
+                           base + "/so-get"])
+
+    assert Counter(pedidos) == Counter({
+        ("HEAD", "/ok"): 2,  # o próprio /ok e o fim da cadeia de /r1
+        ("HEAD", "/so-get"): 1, ("GET", "/so-get"): 1,
+        ("HEAD", "/r1"): 1, ("HEAD", "/r2"): 1,
+        ("HEAD", "/quebrado"): 1, ("GET", "/quebrado"): 1,
+    })
+
+
+def test_mesma_url_ao_mesmo_tempo_e_conferida_uma_vez(stub, verificador):
+    base, pedidos = stub
+    threads = [threading.Thread(target=verificador.verificar, args=([base + "/lento"],)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pedidos == [("HEAD", "/lento")]
+
+
+def test_cache_respeita_ttl(stub, tmp_path):
+    base, pedidos = stub
+    urls = [base + "/ok", base + "/quebrado"]
+    arquivo = tmp_path / "links.json"
+
+    verificador = qatool.VerificadorLinks(ttl=3600, arquivo=str(arquivo))
+    primeiro = verificador.verificar(urls)
+    feitos = len(pedidos)
+    assert verificador.verificar(urls) == primeiro
+    verificador.fechar()
+    assert len(pedidos) == feitos
+
+    # O cache gravado vale para um verificador novo, dentro do TTL...
+    verificador = qatool.VerificadorLinks(ttl=3600, arquivo=str(arquivo))
+    assert verificador.verificar(urls) == primeiro
+    verificador.fechar()
+    assert len(pedidos) == feitos
+
+    # ...e é ignorado depois dele
+    verificador = qatool.VerificadorLinks(ttl=0, arquivo=str(arquivo))
+    verificador.verificar(urls)
+    verificador.fechar()
+    assert len(pedidos) == 2 * feitos
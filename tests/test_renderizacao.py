@@ -0,0 +1,144 @@
+"""
+Renderização pelo Playwright (PoolNavegador / renderizar_urls) contra
+páginas servidas localmente, nos perfis completo e rapido. Pulado quando o
+Playwright ou o Chromium não estão instalados (python -m playwright install
+chromium).
+"""
+import asyncio
+import base64
+import os
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import qatool
+
+
+def _chromium_instalado():
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        return False
+    with sync_playwright() as p:
+        return os.path.exists(p.chromium.executable_path)
+
+
+pytestmark = pytest.mark.skipif(not _chromium_instalado(), reason="Playwright/Chromium não instalado")
+
+PERFIS = ["completo", "rapido"]
+ATRASO_PAGINA = 0.3
+PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+PAGINA = """<!doctype html><html><head><title>Página {n}</title></head><body><main>
+<h1>Raça {n}</h1><p>Texto que vem do servidor, longo o bastante para ser o conteúdo principal.</p>
+<img src="/imagem.png" alt="foto {n}"></main>
+<script>
+var p = document.createElement("p");
+p.textContent = "Inserido pelo JavaScript {n}";
+document.querySelector("main").appendChild(p);
+</script></body></html>"""
+
+
+class EstadoServidor:
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.pedidos = []
+        self.simultaneas = self.max_simultaneas = 0
+
+
+def _manipulador(estado):
+    class Manipulador(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _enviar(self, corpo, tipo="text/html; charset=utf-8", codigo=200, cabecalhos=()):
+            self.send_response(codigo)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+            for nome, valor in cabecalhos:
+                self.send_header(nome, valor)
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def do_GET(self):
+            with estado.trava:
+                estado.pedidos.append(self.path)
+            if self.path.startswith("/pagina/"):
+                # Páginas lentas: dá para ver quantas o navegador abre ao mesmo tempo
+                with estado.trava:
+                    estado.simultaneas += 1
+                    estado.max_simultaneas = max(estado.max_simultaneas, estado.simultaneas)
+                time.sleep(ATRASO_PAGINA)
+                with estado.trava:
+                    estado.simultaneas -= 1
+                self._enviar(PAGINA.format(n=self.path.rsplit("/", 1)[1]).encode("utf-8"))
+            elif self.path == "/imagem.png":
+                self._enviar(PNG, "image/png")
+            elif self.path == "/cookie":
+                self._enviar(b"<html><body><main>cookie gravado</main></body></html>",
+                             cabecalhos=[("Set-Cookie", "visita=1; Path=/")])
+            elif self.path == "/eco":
+                cookie = escape(self.headers.get("Cookie") or "sem cookie")
+                self._enviar(f"<html><body><main>{cookie}</main></body></html>".encode("utf-8"))
+            else:
+                self._enviar(b"nada", "text/plain", 404)
+
+    return Manipulador
+
+
+@pytest.fixture
+def site(servir):
+    estado = EstadoServidor()
+    return servir(_manipulador(estado)), estado
+
+
+@pytest.mark.parametrize("perfil", PERFIS)
+def test_renderiza_paginas_com_javascript(site, perfil):
+    base, estado = site
+    urls = [f"{base}/pagina/{n}" for n in range(3)] + ["http://127.0.0.1:1/recusada"]
+    tempos = []
+    htmls = qatool.renderizar_urls(urls, concorrencia=2, perfil=perfil, tempos=tempos)
+
+    for n, html in enumerate(htmls[:3]):
+        assert f"Inserido pelo JavaScript {n}" in html
+        pagina = qatool.extrair_pagina(html)
+        assert pagina.titulo == f"Página {n}"
+        assert pagina.alt_tags == [f"foto {n}"]
+    # Uma URL que falha volta como exceção, sem derrubar as outras
+    assert isinstance(htmls[3], Exception)
+    assert sorted(t["url"] for t in tempos) == sorted(urls[:3])
+    assert all(t["perfil"] == perfil and t["total"] > 0 for t in tempos)
+    # O perfil rapido bloqueia imagens; o completo carrega a página inteira
+    assert ("/imagem.png" in estado.pedidos) == (perfil == "completo")
+
+
+@pytest.mark.parametrize("perfil", PERFIS)
+def test_respeita_limite_de_concorrencia(site, perfil):
+    base, estado = site
+    urls = [f"{base}/pagina/{n}" for n in range(6)]
+    htmls = qatool.renderizar_urls(urls, concorrencia=2, perfil=perfil)
+
+    assert all(isinstance(html, str) for html in htmls)
+    assert estado.max_simultaneas == 2
+
+
+@pytest.mark.parametrize("perfil", PERFIS)
+def test_reaproveita_navegador_com_contexto_novo_por_pagina(site, perfil):
+    base, _ = site
+
+    async def rodar():
+        async with qatool.PoolNavegador(concorrencia=1, perfil=perfil) as nav:
+            await nav.renderizar(f"{base}/cookie")
+            navegador = nav._browser
+            eco = await nav.renderizar(f"{base}/eco")
+            await nav.renderizar(f"{base}/pagina/1")
+            return eco, navegador is nav._browser, len(nav.tempos)
+
+    eco, mesmo_navegador, renderizadas = asyncio.run(rodar())
+    # Cookies da página anterior não vazam para a próxima...
+    assert "sem cookie" in eco
+    # ...mas o Chromium é o mesmo do começo ao fim
+    assert mesmo_navegador
+    assert renderizadas == 3